@@ -0,0 +1,328 @@
+"""
+Модуль оповещений о снижении цен.
+
+Подписки (порог цены и/или процент снижения) хранятся в базе
+и загружаются в индекс в памяти: для каждого товара - списки,
+отсортированные по порогу и по проценту снижения. После записи пакета
+цен проверяются только подписки товаров, цена которых изменилась,
+двоичным поиском по индексу - без чтения истории и всех подписок.
+Индекс перечитывается из базы, только когда меняется версия подписок
+(table_versions), а версия проверяется не чаще ALERT_REFRESH_INTERVAL.
+
+Classes:
+
+    Alert: Оповещение по подписке.
+
+    LogSink: Получатель оповещений, пишет их в журнал.
+
+    MemorySink: Получатель оповещений в памяти процесса (для проверки
+        и локальной работы).
+
+    WebhookSink: Получатель оповещений, отправляет их пакетом
+        POST-запросом (JSON) на заданный URL через общую HTTP сессию
+        (backend.client).
+
+    AlertIndex: Индекс подписок в памяти.
+
+    AlertPipeline: Проверка изменившихся цен по индексу и отправка
+        оповещений получателю.
+
+Func:
+
+    make_sink: Создаёт получателя оповещений согласно настройкам.
+"""
+import bisect
+import logging
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+import aiohttp
+
+from backend.client import get_client
+from database.FDataBase import (AsyncSessionLocal, select_subscriptions,
+                                select_table_version)
+from config import (ALERT_SINK, ALERT_WEBHOOK_URL, ALERT_WEBHOOK_TIMEOUT,
+                    ALERT_REFRESH_INTERVAL, ALERT_MAX_PENDING)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Alert:
+    """
+    Оповещение по подписке.
+
+    Args:
+
+        subscription_id: id подписки.
+        product_id: id товара.
+        contact: Куда отправлять оповещение.
+        kind: Тип подписки: "threshold" (порог) или "drop" (снижение).
+        value: Порог цены или процент снижения из подписки.
+        old_price: Предыдущая цена товара.
+        new_price: Новая цена товара.
+    """
+    subscription_id: int
+    product_id: int
+    contact: str
+    kind: str
+    value: float
+    old_price: float
+    new_price: float
+
+
+class LogSink:
+    """Получатель оповещений, пишет их в журнал."""
+
+    async def send(self, alerts: list) -> None:
+        """Отправляет пакет оповещений."""
+        for alert in alerts:
+            logger.info("Оповещение: %s", asdict(alert))
+
+
+class MemorySink:
+    """Получатель оповещений в памяти процесса."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, alerts: list) -> None:
+        """Сохраняет пакет оповещений в self.sent."""
+        self.sent.extend(alerts)
+
+
+class WebhookSink:
+    """
+    Получатель оповещений через webhook.
+
+    Args:
+
+        url: URL, на который отправляется пакет оповещений (JSON массив).
+        timeout: Таймаут запроса в секундах.
+    """
+
+    def __init__(self, url: str, timeout: float = ALERT_WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def send(self, alerts: list) -> None:
+        """Отправляет пакет оповещений одним запросом."""
+        session = await get_client()
+        async with session.post(
+                self.url, json=[asdict(alert) for alert in alerts],
+                timeout=self.timeout) as response:
+            response.raise_for_status()
+
+
+def make_sink():
+    """Функция создания получателя оповещений согласно ALERT_SINK."""
+    if ALERT_SINK == "memory":
+        return MemorySink()
+    if ALERT_SINK == "webhook":
+        if not ALERT_WEBHOOK_URL:
+            raise RuntimeError("Для ALERT_SINK=webhook требуется "
+                               "ALERT_WEBHOOK_URL.")
+        return WebhookSink(ALERT_WEBHOOK_URL)
+    return LogSink()
+
+
+def _sorted(items: list) -> tuple:
+    """Сортирует подписки по значению: (значения, подписки)."""
+    items.sort()
+    return [item[0] for item in items], items
+
+
+class AlertIndex:
+    """
+    Индекс подписок в памяти.
+
+    Notes:
+
+        Для каждого товара хранятся пары (значения, подписки),
+        отсортированные по порогу цены и по проценту снижения, поэтому
+        проверка товара - O(log n + k), где k - число сработавших
+        подписок.
+    """
+
+    def __init__(self):
+        self.thresholds = {}
+        self.drops = {}
+        self.size = 0
+
+    def load(self, subscriptions: list) -> None:
+        """
+        Перестраивает индекс.
+
+        Args:
+
+            subscriptions: Список (id подписки, id товара, контакт,
+                порог, процент снижения).
+        """
+        thresholds, drops = defaultdict(list), defaultdict(list)
+        for subscription_id, product_id, contact, threshold, drop_percent \
+                in subscriptions:
+            if threshold is not None:
+                thresholds[product_id].append(
+                    (threshold, subscription_id, contact))
+            if drop_percent is not None:
+                drops[product_id].append(
+                    (drop_percent, subscription_id, contact))
+        self.thresholds = {product_id: _sorted(items)
+                           for product_id, items in thresholds.items()}
+        self.drops = {product_id: _sorted(items)
+                      for product_id, items in drops.items()}
+        self.size = len(subscriptions)
+
+    def evaluate(self, product_id: int, old_price: float,
+                 new_price: float) -> list:
+        """
+        Проверяет подписки товара при изменении цены.
+
+        Args:
+
+            product_id: id товара.
+            old_price: Предыдущая цена.
+            new_price: Новая цена.
+
+        Returns:
+
+            Возвращает список Alert: пороги, которые цена пересекла сверху
+            вниз (new_price <= порог < old_price), и проценты снижения,
+            не превышающие фактическое снижение. По каждой подписке
+            не больше одного оповещения: если у подписки сработали и порог,
+            и процент снижения, отправляется оповещение о пороге.
+        """
+        alerts = []
+        if not old_price or new_price >= old_price:
+            return alerts
+        entry = self.thresholds.get(product_id)
+        if entry:
+            values, items = entry
+            start = bisect.bisect_left(values, new_price)
+            end = bisect.bisect_left(values, old_price)
+            alerts.extend(
+                Alert(subscription_id, product_id, contact, "threshold",
+                      threshold, old_price, new_price)
+                for threshold, subscription_id, contact in items[start:end])
+        entry = self.drops.get(product_id)
+        if entry:
+            values, items = entry
+            percent = (old_price - new_price) / old_price * 100
+            end = bisect.bisect_right(values, percent)
+            sent = {alert.subscription_id for alert in alerts}
+            alerts.extend(
+                Alert(subscription_id, product_id, contact, "drop",
+                      drop_percent, old_price, new_price)
+                for drop_percent, subscription_id, contact in items[:end]
+                if subscription_id not in sent)
+        return alerts
+
+
+class AlertPipeline:
+    """
+    Проверка подписок по пакетам изменившихся цен.
+
+    Args:
+
+        sink: Получатель оповещений (объект с async send(alerts)).
+        refresh_interval: Как часто (сек) проверять версию подписок.
+        max_pending: Сколько неотправленных оповещений хранить
+            для повторной отправки.
+
+    Notes:
+
+        Оповещения, которые не удалось отправить, повторяются вместе
+        со следующим пакетом. Сверх max_pending самые старые
+        отбрасываются и учитываются в счётчике dropped.
+    """
+
+    def __init__(self, sink,
+                 refresh_interval: float = ALERT_REFRESH_INTERVAL,
+                 max_pending: int = ALERT_MAX_PENDING):
+        self.sink = sink
+        self.refresh_interval = refresh_interval
+        self.max_pending = max_pending
+        self.index = AlertIndex()
+        self.version = None
+        self.checked_at = 0.0
+        self.pending = []
+        self.counters = {"evaluated": 0, "sent": 0, "failed": 0,
+                         "dropped": 0}
+
+    def invalidate(self) -> None:
+        """Проверить версию подписок при следующем пакете цен."""
+        self.checked_at = 0.0
+
+    async def refresh(self) -> None:
+        """
+        Функция обновления индекса подписок.
+
+        Notes:
+
+            Версия подписок читается одним запросом не чаще
+            refresh_interval, сами подписки - только при её изменении.
+        """
+        now = time.monotonic()
+        if now - self.checked_at < self.refresh_interval:
+            return
+        self.checked_at = now
+        async with AsyncSessionLocal() as session:
+            version = await select_table_version("subscriptions",
+                                                 session=session)
+            if version == self.version:
+                return
+            subscriptions = await select_subscriptions(session=session)
+        self.index.load(subscriptions)
+        self.version = version
+        logger.info("Индекс подписок обновлён: %s подписок",
+                    self.index.size)
+
+    async def process(self, prices: list) -> int:
+        """
+        Функция проверки пакета записанных цен.
+
+        Args:
+
+            prices: Список словарей вида {"product_id": id,
+                "price": цена, "last_price": предыдущая цена}.
+
+        Returns:
+
+            Проверяет подписки только товаров из пакета, цена которых
+            снизилась, отправляет оповещения (и не отправленные ранее)
+            получателю одним пакетом, возвращает число отправленных.
+        """
+        await self.refresh()
+        if not self.index.size and not self.pending:
+            return 0
+        alerts, self.pending = self.pending, []
+        for item in prices:
+            if item.get("last_price") is None:
+                continue
+            self.counters["evaluated"] += 1
+            alerts.extend(self.index.evaluate(
+                item["product_id"], item["last_price"], item["price"]))
+        if not alerts:
+            return 0
+        try:
+            await self.sink.send(alerts)
+        except Exception as ex:
+            self.counters["failed"] += len(alerts)
+            dropped = max(0, len(alerts) - self.max_pending)
+            self.counters["dropped"] += dropped
+            self.pending = alerts[dropped:]
+            logger.error("Ошибка отправки оповещений (%s отложено, "
+                         "%s отброшено): %s", len(self.pending), dropped, ex)
+            return 0
+        self.counters["sent"] += len(alerts)
+        return len(alerts)
+
+    def stats(self) -> dict:
+        """Функция получения счётчиков проверок и оповещений."""
+        return {**self.counters, "pending": len(self.pending),
+                "subscriptions": self.index.size}
+
+
+alert_pipeline = AlertPipeline(make_sink())
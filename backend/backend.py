@@ -1,21 +1,158 @@
 """
 Моудль логики парсинга товаров в магазине МВИДЕО.
 
+Classes:
+
+    TokenBucket: Ограничитель частоты запросов (token bucket)
+        с адаптивной скоростью: снижается вдвое на 429/403,
+        плавно растёт до максимума на успешных ответах.
+
+    CircuitBreaker: Размыкатель цепи - приостанавливает запросы к хосту
+        после серии ошибок подряд.
+
+    FetchScheduler: Планировщик запросов - для каждого хоста свой
+        TokenBucket и CircuitBreaker, повторы на 429/403/5xx/сетевых ошибках
+        с ограниченной экспоненциальной задержкой и случайным разбросом.
+        Одновременные запросы одного URL объединяются в один, а повторные
+        отправляются условными (If-None-Match/If-Modified-Since).
+
 Func:
 
+    normalize_url: Приводит URL к каноническому виду (ключ кэша).
+
     get_html: Получает на вход url (данные полученые от API магазина),
-        возвращает спарсенные данные(dict).
+        возвращает спарсенные данные(dict). Использует общую
+        HTTP сессию из backend.client и планировщик fetch_scheduler,
+        тело ответа разбирается из bytes быстрым JSON-бэкендом
+        (backend.parser).
 
     get_info_item: Получает на вход спарсенные данные(dict), возвращает:
         название товара, описание товара и рейтинг товара.
+
+    get_price_item: Получает на вход спарсенные данные(dict), возвращает
+        актуальную цену товара.
+
+    get_items_info: Получает на вход список URL от API с информацией
+        о товарах, конкурентно получает и разбирает их,
+        возвращает список результатов в том же порядке.
 """
-import json
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import aiohttp
 
+from backend.client import get_client
+from backend.parser import loads, extract_info, extract_price
+from config import (ADD_PRODUCTS_CONCURRENCY, FETCH_RATE_PER_HOST,
+                    FETCH_RATE_MIN, FETCH_BURST, FETCH_MAX_RETRIES,
+                    FETCH_BACKOFF_BASE, FETCH_BACKOFF_MAX,
+                    BREAKER_FAILURES, BREAKER_RESET, UPSTREAM_CACHE_BYTES,
+                    UPSTREAM_CACHE_MAX_BODY)
 
-async def get_html(url: str):
+
+# Статусы ответа, при которых запрос повторяется
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+
+# Статусы ответа, при которых снижается скорость запросов к хосту:
+# 403 магазин отдаёт защитой от ботов так же, как 429
+THROTTLE_STATUSES = {403, 429}
+
+
+class TokenBucket:
     """
-    Функция получения данных с HTML страницы.
+    Ограничитель частоты запросов к хосту.
+
+    Args:
+
+        rate: Максимальная скорость (запросов в секунду).
+        capacity: Размер пачки запросов без ожидания.
+        min_rate: Минимальная скорость при снижении на 429/403.
+    """
+
+    def __init__(self, rate: float, capacity: int, min_rate: float):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self) -> None:
+        """Ожидает, пока не появится свободный токен, и забирает его."""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, retry_after: float | None = None) -> None:
+        """Снижает скорость вдвое (ответ 429/403), при Retry-After - пауза."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = time.monotonic() + retry_after
+
+    def recover(self) -> None:
+        """Плавно повышает скорость после успешного ответа."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи для хоста.
+
+    Args:
+
+        failures: Количество ошибок подряд, после которого цепь размыкается.
+        reset_timeout: Через сколько секунд пропустить пробный запрос.
+    """
+
+    def __init__(self, failures: int, reset_timeout: float):
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def allow(self) -> bool:
+        """Разрешён ли запрос (цепь замкнута или пробный запрос)."""
+        if self.opened_at is None:
+            return True
+        if self.trial:
+            return False
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        """Отмечает успешный запрос и замыкает цепь."""
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self) -> None:
+        """Отмечает ошибку, при превышении порога размыкает цепь."""
+        self.failures += 1
+        if self.trial or self.failures >= self.max_failures:
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+
+def normalize_url(url: str) -> str:
+    """
+    Функция нормализации URL.
 
     Args:
 
@@ -23,19 +160,229 @@ async def get_html(url: str):
 
     Returns:
 
-        Возвращает словарь с данными сайта(МВИДЕО).
+        Возвращает URL с хостом в нижнем регистре, без порта по умолчанию,
+        фрагмента и с отсортированными параметрами запроса.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80),
+                                                    ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class FetchScheduler:
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Mobile Safari/537.36",
-        "Cookie": "MVID_CITY_ID=CityCZ_975; MVID_REGION_ID=1; MVID_REGION_SHOP=S002; MVID_TIMEZONE_OFFSET=3;"
-    }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
+    Планировщик запросов к API магазина.
+
+    Args:
+
+        rate: Максимальная скорость запросов к одному хосту (в секунду).
+        burst: Размер пачки запросов к хосту без ожидания.
+        min_rate: Минимальная скорость при снижении на 429/403.
+        max_retries: Количество повторов запроса.
+        backoff_base: Начальная задержка повтора в секундах.
+        backoff_max: Максимальная задержка повтора в секундах.
+        breaker_failures: Порог ошибок подряд для размыкания цепи.
+        breaker_reset: Время до пробного запроса в секундах.
+        cache_bytes: Общий объём сохранённых тел ответов в байтах.
+        max_body: Максимальный размер сохраняемого тела ответа в байтах.
+    """
+
+    def __init__(self, rate: float = FETCH_RATE_PER_HOST,
+                 burst: int = FETCH_BURST,
+                 min_rate: float = FETCH_RATE_MIN,
+                 max_retries: int = FETCH_MAX_RETRIES,
+                 backoff_base: float = FETCH_BACKOFF_BASE,
+                 backoff_max: float = FETCH_BACKOFF_MAX,
+                 breaker_failures: int = BREAKER_FAILURES,
+                 breaker_reset: float = BREAKER_RESET,
+                 cache_bytes: int = UPSTREAM_CACHE_BYTES,
+                 max_body: int = UPSTREAM_CACHE_MAX_BODY):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.cache_bytes = cache_bytes
+        self.max_body = max_body
+        self.cached_bytes = 0
+        self.hosts = {}
+        self.validators = OrderedDict()
+        self.inflight = {}
+        self.counters = {"requests": 0, "not_modified": 0, "coalesced": 0}
+
+    def _host(self, url: str) -> tuple:
+        """Возвращает (TokenBucket, CircuitBreaker) хоста."""
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = (
+                TokenBucket(self.rate, self.burst, self.min_rate),
+                CircuitBreaker(self.breaker_failures, self.breaker_reset))
+        return self.hosts[host]
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        """Задержка перед повтором: экспонента с ограничением и разбросом."""
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def _remember(self, url: str, response: aiohttp.ClientResponse,
+                  body: bytes) -> None:
+        """
+        Сохраняет валидаторы ответа и его тело для условных запросов.
+        Вытесняет давно не использованные записи сверх cache_bytes.
+        """
+        self._forget(url)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified or len(body) > self.max_body:
+            return
+        self.validators[url] = (etag, last_modified, body)
+        self.cached_bytes += len(body)
+        while self.cached_bytes > self.cache_bytes:
+            self._forget(next(iter(self.validators)))
+
+    def _forget(self, url: str) -> None:
+        """Удаляет сохранённые валидаторы и тело ответа URL."""
+        cached = self.validators.pop(url, None)
+        if cached is not None:
+            self.cached_bytes -= len(cached[2])
+
+    def _conditional_headers(self, url: str) -> dict:
+        """Заголовки условного запроса по сохранённым валидаторам."""
+        cached = self.validators.get(url)
+        if cached is None:
+            return {}
+        etag, last_modified, _ = cached
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    async def fetch(self, url: str) -> dict:
+        """
+        Функция получения данных с учётом ограничений хоста.
+
+        Args:
+
+            url: URL адресс товара.
+
+        Returns:
+
+            Возвращает словарь с данными сайта(МВИДЕО), иначе
+            словарь с сообщением об ошибке.
+
+        Notes:
+
+            Одновременные вызовы для одного (нормализованного) URL
+            ожидают один общий запрос. Нормализованный URL - только ключ
+            объединения и сохранённых валидаторов, магазину отправляется
+            URL в исходном виде.
+        """
+        key = normalize_url(url)
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, key))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, key: str) -> dict:
+        """
+        Выполняет запрос: ограничение частоты, повторы, условность.
+        url - запрашиваемый адрес, key - его нормализованный вид.
+        """
+        bucket, breaker = self._host(key)
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                return {'error': "Проблема с получением данных о товаре: "
+                                 "запросы к магазину приостановлены после "
+                                 "серии ошибок"}
+            await bucket.acquire()
+            retry_after = None
+            session = await get_client()
+            headers = self._conditional_headers(key)
+            self.counters["requests"] += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and key in self.validators:
+                        self.counters["not_modified"] += 1
+                        self.validators.move_to_end(key)
+                        body = self.validators[key][2]
+                    elif response.status in RETRY_STATUSES:
+                        retry_after = _retry_after(response)
+                        if response.status in THROTTLE_STATUSES:
+                            bucket.throttle(retry_after)
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason)
+                    else:
+                        body = await response.read()
+                        if response.status == 200:
+                            self._remember(key, response, body)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                breaker.failure()
+                error = ex
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            breaker.success()
+            bucket.recover()
             try:
-                text = await response.text()
-                return {"message": json.loads(text), "status_code": 200}
+                return {"message": loads(body), "status_code": 200}
             except Exception as ex:
                 return {'error': f"Проблема с получением данных о товаре: {ex}"}
+        return {'error': f"Проблема с получением данных о товаре: {error}"}
+
+    def stats(self) -> dict:
+        """
+        Функция получения состояния ограничителей по хостам
+        и счётчиков условных и объединённых запросов.
+        """
+        return {**self.counters,
+                "cached_urls": len(self.validators),
+                "cached_bytes": self.cached_bytes,
+                "hosts": {host: {"rate": round(bucket.rate, 2),
+                                 "circuit_open": breaker.opened_at is not None,
+                                 "failures": breaker.failures}
+                          for host, (bucket, breaker) in self.hosts.items()}}
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> float | None:
+    """Читает заголовок Retry-After (в секундах)."""
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+fetch_scheduler = FetchScheduler()
+
+
+async def get_html(url: str):
+    """
+    Функция получения данных с HTML страницы.
+
+    Args:
+
+        url: URL адресс товара.
+
+    Returns:
+
+        Возвращает словарь с данными сайта(МВИДЕО).
+    """
+    return await fetch_scheduler.fetch(url)
 
 
 async def get_info_item(data_info: dict) -> dict:
@@ -51,10 +398,59 @@ async def get_info_item(data_info: dict) -> dict:
         Возвращает словарь с общей информацией о товаре.
     """
     try:
-        return {"name": data_info['body']['name'],
-                "description": data_info['body']['description'],
-                "rating": data_info['body']['rating']['star'],
+        info = extract_info(data_info)
+        return {"name": info.name,
+                "description": info.description,
+                "rating": info.rating,
                 "status_code": 200}
     except Exception as ex:
         return {'error': f"Проблема с получением информации о товаре: {ex}",
                 "status_code": 422}
+
+
+async def get_price_item(data_price: dict) -> dict:
+    """
+    Функция поиска цены продукта.
+
+    Args:
+
+        data_price: Словарь с данными о цене товара(страница с API).
+
+    Returns:
+
+        Возвращает словарь с ценой товара(цена со скидкой,
+        если она есть, иначе базовая цена).
+    """
+    try:
+        return {"price": extract_price(data_price).price,
+                "status_code": 200}
+    except Exception as ex:
+        return {'error': f"Проблема с получением цены товара: {ex}",
+                "status_code": 422}
+
+
+async def get_items_info(urls: list,
+                         concurrency: int = ADD_PRODUCTS_CONCURRENCY) -> list:
+    """
+    Функция конкурентного получения информации о нескольких товарах.
+
+    Args:
+
+        urls: Список ссылок на API с общей информацией о товарах.
+        concurrency: Максимальное число одновременных запросов к магазину.
+
+    Returns:
+
+        Возвращает список словарей (как у get_info_item)
+        в порядке переданных ссылок.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str) -> dict:
+        async with semaphore:
+            data_info = await get_html(url=url)
+        if "error" in data_info:
+            return {"error": data_info["error"], "status_code": 422}
+        return await get_info_item(data_info=data_info["message"])
+
+    return await asyncio.gather(*(fetch(url) for url in urls))
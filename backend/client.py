@@ -0,0 +1,69 @@
+"""
+Модуль общего HTTP клиента для запросов к API магазина МВИДЕО.
+
+Одна сессия aiohttp с пулом соединений живёт всё время работы приложения,
+поэтому соединения (TCP+TLS) и DNS переиспользуются между запросами.
+Время и статус каждого запроса записываются trace-хуками (metrics.metrics).
+
+Func:
+
+    start_client: Создаёт общую сессию aiohttp с настроенным пулом.
+
+    close_client: Закрывает общую сессию и её соединения.
+
+    get_client: Возвращает общую сессию, создавая её при первом обращении.
+"""
+import aiohttp
+
+from metrics.metrics import trace_config
+from config import (HTTP_LIMIT, HTTP_LIMIT_PER_HOST, HTTP_DNS_TTL,
+                    HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECT_TIMEOUT,
+                    HTTP_READ_TIMEOUT)
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Mobile Safari/537.36",
+    "Cookie": "MVID_CITY_ID=CityCZ_975; MVID_REGION_ID=1; MVID_REGION_SHOP=S002; MVID_TIMEZONE_OFFSET=3;"
+}
+
+_session = None
+
+
+async def start_client() -> aiohttp.ClientSession:
+    """
+    Функция создания общей HTTP сессии.
+
+    Returns:
+
+        Возвращает сессию aiohttp с пулом соединений keep-alive,
+        ограничением соединений на хост, кэшем DNS и таймаутами.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_LIMIT,
+            limit_per_host=HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT)
+        timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT,
+                                        sock_read=HTTP_READ_TIMEOUT)
+        tracing = trace_config()
+        _session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers=HEADERS,
+            trace_configs=[tracing] if tracing else None)
+    return _session
+
+
+async def close_client() -> None:
+    """Функция закрытия общей HTTP сессии."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def get_client() -> aiohttp.ClientSession:
+    """Функция получения общей HTTP сессии."""
+    if _session is None or _session.closed:
+        return await start_client()
+    return _session
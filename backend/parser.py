@@ -0,0 +1,133 @@
+"""
+Модуль разбора ответов API магазина МВИДЕО.
+
+Тело ответа читается как bytes и разбирается один раз самым быстрым
+доступным JSON-бэкендом (orjson, затем ujson, иначе стандартный json),
+без промежуточного декодирования в str. Из документа извлекаются только
+нужные поля в типизированные записи со __slots__.
+
+Classes:
+
+    ItemInfo: Название, описание и рейтинг товара.
+
+    ItemPrice: Базовая цена и цена со скидкой товара.
+
+Func:
+
+    loads: Разбирает JSON из bytes выбранным бэкендом.
+
+    extract_info: Получает на вход разобранный ответ API с информацией
+        о товаре, возвращает ItemInfo.
+
+    extract_price: Получает на вход разобранный ответ API с ценой
+        товара, возвращает ItemPrice.
+"""
+import json
+from dataclasses import dataclass
+
+from config import JSON_PARSER
+
+
+def _json_loads(data: bytes):
+    """Стандартный json (ответы магазина в UTF-8)."""
+    return json.loads(data.decode("utf-8"))
+
+
+def _select_backend(name: str) -> tuple:
+    """
+    Выбирает JSON-бэкенд: (название, функция разбора). При auto
+    берётся первый установленный, а явно заданный, но не установленный
+    бэкенд - ошибка настройки.
+    """
+    candidates = ("orjson", "ujson") if name == "auto" else (name,)
+    for candidate in candidates:
+        if candidate == "json":
+            break
+        try:
+            module = __import__(candidate)
+        except ImportError:
+            if name == "auto":
+                continue
+            raise RuntimeError(
+                f"Для JSON_PARSER={name} требуется пакет {name} "
+                f"(pip install {name}).")
+        return candidate, module.loads
+    return "json", _json_loads
+
+
+JSON_BACKEND, loads = _select_backend(JSON_PARSER)
+
+
+@dataclass(slots=True)
+class ItemInfo:
+    """
+    Информация о товаре.
+
+    Args:
+
+        name: Название товара.
+        description: Описание товара.
+        rating: Рейтинг товара.
+    """
+    name: str
+    description: str | None
+    rating: float | None
+
+
+@dataclass(slots=True)
+class ItemPrice:
+    """
+    Цена товара.
+
+    Args:
+
+        base_price: Базовая цена.
+        sale_price: Цена со скидкой (если есть).
+    """
+    base_price: float
+    sale_price: float | None
+
+    @property
+    def price(self) -> float:
+        """Актуальная цена: со скидкой, если она есть, иначе базовая."""
+        return self.sale_price or self.base_price
+
+
+def extract_info(data: dict) -> ItemInfo:
+    """
+    Функция извлечения информации о товаре.
+
+    Args:
+
+        data: Разобранный ответ API с общей информацией о товаре.
+
+    Returns:
+
+        Возвращает ItemInfo (описание и рейтинг могут быть None),
+        при отсутствии названия - KeyError/TypeError.
+    """
+    body = data['body']
+    return ItemInfo(name=body['name'],
+                    description=body.get('description'),
+                    rating=(body.get('rating') or {}).get('star'))
+
+
+def extract_price(data: dict) -> ItemPrice:
+    """
+    Функция извлечения цены товара.
+
+    Args:
+
+        data: Разобранный ответ API с ценой товара.
+
+    Returns:
+
+        Возвращает ItemPrice: если базовой цены нет (или она null),
+        базовой считается цена со скидкой. Если нет обеих цен -
+        KeyError/TypeError.
+    """
+    price = data['body']['materialPrices'][0]['price']
+    sale_price = price.get('salePrice')
+    base_price = price.get('basePrice') or sale_price
+    return ItemPrice(base_price=float(base_price),
+                     sale_price=float(sale_price) if sale_price else None)
@@ -0,0 +1,82 @@
+"""
+Бенчмарк пакетного добавления товаров.
+
+Измеряет пропускную способность конвейера маршрута /parsing/add_products
+(конкурентное получение информации + один многострочный INSERT)
+на 100, 1000 и 10000 товаров против локальной заглушки МВИДЕО.
+Требует настроенную базу данных (config.py); добавленные товары удаляются.
+
+Ограничение частоты запросов к хосту (FETCH_RATE_PER_HOST) на время
+замеров снимается, иначе измерялся бы только ограничитель. Отдельный
+прогон идёт против заглушки, отвечающей 429/503 на FAIL_RATE запросов:
+он проверяет повторы, снижение скорости и размыкатель цепи
+(в результате - число запросов и состояние хоста).
+
+    python -m benchmarks.bench_add_products
+"""
+import asyncio
+import time
+
+from sqlalchemy import delete
+
+import backend.backend as backend
+from backend.backend import FetchScheduler, get_items_info
+from backend.client import close_client
+from benchmarks.stub_mvideo import start_stub
+from database.FDataBase import (AsyncSessionLocal, Product, add_items_info,
+                                create_tables)
+
+
+SIZES = (100, 1000, 10000)
+
+# Скорость запросов к заглушке, при которой ограничитель не мешает замеру
+BENCH_RATE = 1_000_000
+
+# Доля ответов 429/503 и размер прогона с ошибками заглушки
+FAIL_RATE = 0.05
+FAIL_SIZE = 1000
+
+
+async def bench(base_url: str, size: int) -> dict:
+    """Добавляет size товаров, возвращает время и пропускную способность."""
+    backend.fetch_scheduler = FetchScheduler(rate=BENCH_RATE,
+                                             burst=BENCH_RATE)
+    urls = [f"{base_url}/info/{i}" for i in range(size)]
+    started = time.perf_counter()
+    infos = await get_items_info(urls)
+    rows = [{"name": data["name"], "description": data["description"],
+             "rating": data["rating"], "url_info": url,
+             "url_price": url.replace("/info/", "/price/")}
+            for url, data in zip(urls, infos) if data["status_code"] == 200]
+    async with AsyncSessionLocal() as session:
+        resault = await add_items_info(items=rows, session=session)
+    elapsed = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(Product).where(Product.id.in_(resault["message"])))
+        await session.commit()
+    return {"items": size, "added": len(resault["message"]),
+            "seconds": round(elapsed, 3),
+            "items_per_sec": round(size / elapsed, 1),
+            "fetch": backend.fetch_scheduler.stats()}
+
+
+async def main() -> None:
+    """Стартовая функция бенчмарка."""
+    await create_tables()
+    runner, base_url = await start_stub()
+    failing_runner, failing_url = await start_stub(port=8082,
+                                                   fail_rate=FAIL_RATE)
+    try:
+        for size in SIZES:
+            print(await bench(base_url, size))
+        print("fail_rate", FAIL_RATE, await bench(failing_url, FAIL_SIZE))
+    finally:
+        await close_client()
+        await runner.cleanup()
+        await failing_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,335 @@
+"""
+Нагрузочный бенчмарк маршрутов /parsing/*.
+
+Заполняет базу заданным числом товаров и строк истории цен
+(generate_series, до миллионов строк), запускает отдельными процессами
+заглушку МВИДЕО и приложение (uvicorn, мониторинг выключен) и для каждого
+маршрута на каждом уровне конкурентности измеряет пропускную способность
+и задержку p50/p95/p99. Результат пишется в JSON (по умолчанию
+benchmarks/results/<коммит>.json) и сравнивается между коммитами
+через benchmarks.compare. Запускать только на тестовой базе: таблицы
+очищаются.
+
+    python -m benchmarks.bench_api --products 100000 --rows 5000000 \\
+        --concurrency 1 10 50 --requests 1000
+
+Маршруты изменения данных (add_product, add_products, delete_product,
+subscribe, unsubscribe) меняют заполненные данные, поэтому чтение идёт
+по первой половине товаров, удаление товаров - с конца списка,
+а удаление подписок - с начала (заполняется по подписке на товар).
+
+Запущенному приложению ограничение частоты запросов к магазину
+(FETCH_RATE_PER_HOST, FETCH_BURST) задаётся --fetch-rate: по умолчанию
+оно фактически снято, иначе add_product/add_products измеряли бы только
+ограничитель. С --fail-rate заглушка отвечает 429/503 на заданную долю
+запросов - замер маршрутов добавления с повторами.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+from sqlalchemy import text
+
+from database.FDataBase import create_tables, engine, migrate_tables
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Запросов на прогрев каждого маршрута перед замерами
+WARMUP = 20
+
+
+async def seed(products: int, rows: int, stub_url: str) -> None:
+    """Очищает таблицы и заполняет их тестовыми данными."""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "TRUNCATE price_history, price_history_daily, products, "
+            "alert_subscriptions, table_versions RESTART IDENTITY CASCADE"))
+        await conn.execute(text(
+            "INSERT INTO products "
+            "(name, description, rating, url_info, url_price, last_price) "
+            "SELECT 'bench ' || i, 'Описание товара ' || i, "
+            "3 + i % 20 / 10.0, "
+            "CAST(:stub AS text) || '/info/' || i, "
+            "CAST(:stub AS text) || '/price/' || i, 1000 + i % 97 "
+            "FROM generate_series(1, :n) i"),
+            {"n": products, "stub": stub_url})
+        await conn.execute(text(
+            "INSERT INTO price_history (product_id, price, timestamp) "
+            "SELECT 1 + i % :p, 1000 + i % 97, "
+            "now() - (i / :p) * interval '1 hour' "
+            "FROM generate_series(1, :n) i"),
+            {"n": rows, "p": products})
+        await conn.execute(text(
+            "INSERT INTO alert_subscriptions "
+            "(product_id, contact, threshold, drop_percent) "
+            "SELECT i, 'bench' || i, 900 + i % 97, 5 "
+            "FROM generate_series(1, :n) i"),
+            {"n": products})
+        await conn.execute(text("ANALYZE products"))
+        await conn.execute(text("ANALYZE price_history"))
+
+
+def scenarios(products: int, stub_url: str) -> dict:
+    """
+    Функция описания нагрузки на маршруты.
+
+    Args:
+
+        products: Количество заполненных товаров.
+        stub_url: Базовый URL заглушки МВИДЕО.
+
+    Returns:
+
+        Возвращает словарь {название: функция}, функция возвращает
+        (метод, путь, параметры запроса aiohttp) очередного запроса.
+    """
+    readable = max(1, products // 2)
+    new_ids = itertools.count(products + 1)
+    deleted_ids = itertools.count(products, -1)
+    unsubscribed_ids = itertools.count(1)
+
+    def pair() -> dict:
+        product_id = next(new_ids)
+        return {"url_info": f"{stub_url}/info/{product_id}",
+                "url_price": f"{stub_url}/price/{product_id}"}
+
+    def item_id() -> int:
+        return random.randint(1, readable)
+
+    return {
+        "add_product": lambda: (
+            "POST", "/parsing/add_product", {"json": pair()}),
+        "add_products": lambda: (
+            "POST", "/parsing/add_products",
+            {"json": {"items": [pair() for _ in range(100)]}}),
+        "delete_product": lambda: (
+            "DELETE", f"/parsing/delete_product/{next(deleted_ids)}", {}),
+        "set_poll_interval": lambda: (
+            "POST", f"/parsing/set_poll_interval/{item_id()}",
+            {"params": {"interval": 600}}),
+        "subscribe": lambda: (
+            "POST", "/parsing/subscribe",
+            {"json": {"product_id": item_id(), "contact": "bench",
+                      "threshold": 900, "drop_percent": 10}}),
+        "unsubscribe": lambda: (
+            "DELETE", f"/parsing/unsubscribe/{next(unsubscribed_ids)}", {}),
+        "get_list_monitoring": lambda: (
+            "GET", "/parsing/get_list_monitoring",
+            {"params": {"after_id": item_id(), "limit": 100}}),
+        "get_history_price_item": lambda: (
+            "GET", f"/parsing/get_history_price_item/{item_id()}",
+            {"params": {"limit": 100}}),
+        "get_history_price_item?bucket=day": lambda: (
+            "GET", f"/parsing/get_history_price_item/{item_id()}",
+            {"params": {"bucket": "day"}}),
+        "export_history": lambda: (
+            "GET", "/parsing/export_history",
+            {"params": {"product_id": item_id()}}),
+        "monitoring_stats": lambda: (
+            "GET", "/parsing/monitoring_stats", {}),
+        "cache_stats": lambda: (
+            "GET", "/parsing/cache_stats", {}),
+    }
+
+
+def percentile(samples: list, q: float) -> float:
+    """Возвращает перцентиль q (0..1) отсортированной выборки в мс."""
+    index = min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))
+    return round(samples[index] * 1000, 2)
+
+
+async def send(client: aiohttp.ClientSession, base_url: str,
+               request) -> bool:
+    """Выполняет запрос, возвращает True при успешном ответе."""
+    method, path, kwargs = request
+    try:
+        async with client.request(method, base_url + path,
+                                  **kwargs) as response:
+            if response.status >= 400:
+                await response.read()
+                return False
+            if response.content_type != "application/json":
+                await response.read()
+                return True
+            body = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return False
+    return not isinstance(body, dict) or \
+        body.get("status_code", 200) < 400
+
+
+async def run_level(client: aiohttp.ClientSession, base_url: str,
+                    make_request, concurrency: int,
+                    requests: int) -> dict:
+    """
+    Функция замера одного маршрута на одном уровне конкурентности.
+
+    Args:
+
+        client: HTTP сессия нагрузочного клиента.
+        base_url: Базовый URL приложения.
+        make_request: Функция, возвращающая очередной запрос.
+        concurrency: Число одновременных запросов.
+        requests: Общее число запросов.
+
+    Returns:
+
+        Возвращает число запросов и ошибок, пропускную способность
+        (запросов в секунду) и задержку (среднее, p50, p95, p99) в мс.
+    """
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            request = make_request()
+            started = time.perf_counter()
+            ok = await send(client, base_url, request)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"concurrency": concurrency,
+            "requests": requests,
+            "errors": errors,
+            "throughput_rps": round(requests / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99)}
+
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    """Ожидает, пока приложение не начнёт отвечать на запросы."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while True:
+            try:
+                async with client.get(
+                        f"{base_url}/parsing/cache_stats") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Приложение {base_url} не запустилось.")
+            await asyncio.sleep(0.2)
+
+
+def git_revision() -> dict:
+    """Возвращает текущий коммит и признак незакоммиченных изменений."""
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], capture_output=True,
+                              text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "-uno"))}
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500,
+                        help="запросов на маршрут и уровень конкурентности")
+    parser.add_argument("--routes", nargs="+",
+                        help="только указанные маршруты")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-port", type=int, default=8081)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="доля ответов 429/503 заглушки")
+    parser.add_argument("--fetch-rate", type=float, default=1_000_000,
+                        help="FETCH_RATE_PER_HOST и FETCH_BURST приложения")
+    parser.add_argument("--base-url",
+                        help="уже запущенное приложение (не запускать своё)")
+    parser.add_argument("--skip-seed", action="store_true",
+                        help="не заполнять базу заново")
+    parser.add_argument("--output", help="файл результатов (JSON)")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    """Стартовая функция бенчмарка."""
+    args = parse_args()
+    revision = git_revision()
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_mvideo",
+         str(args.stub_port), str(args.fail_rate)],
+        stdout=subprocess.DEVNULL)]
+    base_url = args.base_url
+    try:
+        if not args.skip_seed:
+            await create_tables()
+            await migrate_tables()
+            await seed(args.products, args.rows, stub_url)
+        await engine.dispose()
+        if base_url is None:
+            base_url = f"http://127.0.0.1:{args.port}"
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app",
+                 "--host", "127.0.0.1", "--port", str(args.port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                env={**os.environ, "MONITORING_ENABLED": "0",
+                     "FETCH_RATE_PER_HOST": str(args.fetch_rate),
+                     "FETCH_BURST": str(int(args.fetch_rate))}))
+        await wait_ready(base_url)
+
+        results = []
+        connector = aiohttp.TCPConnector(limit=max(args.concurrency))
+        async with aiohttp.ClientSession(connector=connector) as client:
+            for route, make_request in scenarios(args.products,
+                                                 stub_url).items():
+                if args.routes and route not in args.routes:
+                    continue
+                for _ in range(WARMUP):
+                    await send(client, base_url, make_request())
+                for concurrency in args.concurrency:
+                    result = {"route": route, **await run_level(
+                        client, base_url, make_request, concurrency,
+                        args.requests)}
+                    print(json.dumps(result, ensure_ascii=False))
+                    results.append(result)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{revision['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({**revision,
+                   "created_at": datetime.now().isoformat(
+                       timespec="seconds"),
+                   "python": platform.python_version(),
+                   "params": {"products": args.products, "rows": args.rows,
+                              "requests": args.requests,
+                              "workers": args.workers,
+                              "fail_rate": args.fail_rate,
+                              "fetch_rate": args.fetch_rate},
+                   "results": results}, file, ensure_ascii=False, indent=2)
+    print("Результаты:", output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Микро-бенчмарк разбора ответов API МВИДЕО.
+
+Сравнивает прежний путь (bytes -> str -> json.loads -> обход словарей)
+с новым (bytes -> backend.parser.loads -> extract_info/extract_price)
+на образцах ответов из benchmarks/payloads.
+
+    python -m benchmarks.bench_json_parsing [повторов]
+"""
+import json
+import sys
+import timeit
+from pathlib import Path
+
+from backend.parser import JSON_BACKEND, loads, extract_info, extract_price
+
+
+PAYLOADS = Path(__file__).parent / "payloads"
+
+
+def old_info(raw: bytes) -> dict:
+    """Прежний разбор информации о товаре."""
+    data = json.loads(raw.decode("utf-8"))
+    return {"name": data['body']['name'],
+            "description": data['body']['description'],
+            "rating": data['body']['rating']['star']}
+
+
+def old_price(raw: bytes) -> float:
+    """Прежний разбор цены товара."""
+    price = json.loads(raw.decode("utf-8"))['body']['materialPrices'][0]
+    return float(price['price'].get('salePrice')
+                 or price['price']['basePrice'])
+
+
+def new_info(raw: bytes):
+    """Новый разбор информации о товаре."""
+    return extract_info(loads(raw))
+
+
+def new_price(raw: bytes) -> float:
+    """Новый разбор цены товара."""
+    return extract_price(loads(raw)).price
+
+
+def main() -> None:
+    """Стартовая функция бенчмарка."""
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"JSON backend: {JSON_BACKEND}")
+    for name, old, new in (("info", old_info, new_info),
+                           ("price", old_price, new_price)):
+        raw = (PAYLOADS / f"{name}.json").read_bytes()
+        old_time = min(timeit.repeat(lambda: old(raw), number=number,
+                                     repeat=3))
+        new_time = min(timeit.repeat(lambda: new(raw), number=number,
+                                     repeat=3))
+        print(f"{name} ({len(raw)} bytes): "
+              f"old {old_time / number * 1e6:.1f} us, "
+              f"new {new_time / number * 1e6:.1f} us, "
+              f"x{old_time / new_time:.2f}")
+
+
+if __name__ == "__main__":
+    main()
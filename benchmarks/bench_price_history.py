@@ -0,0 +1,106 @@
+"""
+Бенчмарк выборки и удаления истории цен.
+
+Заполняет price_history заданным числом строк (по умолчанию 10 млн)
+через generate_series, затем измеряет задержку выборки истории товара
+за период и удаления товара с историей - без составного индекса
+(product_id, timestamp) и с ним. Запускать только на тестовой базе:
+таблицы очищаются.
+
+    python -m benchmarks.bench_price_history [строк] [товаров]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database.FDataBase import (AsyncSessionLocal, create_tables, engine,
+                                select_history_price)
+
+
+INDEX = "ix_price_history_product_id_timestamp"
+
+
+async def seed(rows: int, products: int) -> None:
+    """Очищает таблицы и заполняет их тестовыми данными."""
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "TRUNCATE price_history, products RESTART IDENTITY CASCADE"))
+        await conn.execute(text(
+            "INSERT INTO products (name, url_info, url_price) "
+            "SELECT 'bench ' || i, 'http://stub/info/' || i, "
+            "'http://stub/price/' || i FROM generate_series(1, :n) i"),
+            {"n": products})
+        await conn.execute(text(
+            "INSERT INTO price_history (product_id, price, timestamp) "
+            "SELECT 1 + i % :p, 1000 + i % 97, "
+            "now() - (i / :p) * interval '1 hour' "
+            "FROM generate_series(1, :n) i"),
+            {"n": rows, "p": products})
+        await conn.execute(text("ANALYZE price_history"))
+
+
+async def timed(coro_factory, repeat: int) -> dict:
+    """Выполняет запрос repeat раз, возвращает p50/p95 задержки в мс."""
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        await coro_factory(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 2)}
+
+
+async def lookup(product_id: int) -> None:
+    """Выборка истории товара за последние 30 дней."""
+    async with AsyncSessionLocal() as session:
+        await select_history_price(
+            product_id=product_id,
+            date_from=datetime.now() - timedelta(days=30),
+            limit=720, session=session)
+
+
+async def remove(product_id: int) -> None:
+    """Удаление товара вместе с его историей цен."""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("DELETE FROM price_history WHERE product_id = :id"),
+            {"id": product_id})
+        await conn.execute(text("DELETE FROM products WHERE id = :id"),
+                           {"id": product_id})
+
+
+async def run(label: str, products: int) -> None:
+    """Измеряет выборку и удаление, печатает результат."""
+    print(label, "lookup", await timed(lambda i: lookup(1 + i), 50))
+    print(label, "delete", await timed(
+        lambda i: remove(products - i), 10))
+
+
+async def main() -> None:
+    """Стартовая функция бенчмарка."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    await create_tables()
+    await seed(rows, products)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {INDEX}"))
+    await run("no index:", products)
+
+    # migrate_tables не пересоздаст индекс: миграция уже отмечена
+    # применённой в schema_migrations
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            f"CREATE INDEX {INDEX} ON price_history (product_id, timestamp)"))
+        await conn.execute(text("ANALYZE price_history"))
+    await run("with index:", products - 10)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
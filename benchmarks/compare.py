@@ -0,0 +1,57 @@
+"""
+Сравнение результатов нагрузочного бенчмарка двух коммитов.
+
+Сопоставляет замеры benchmarks.bench_api по маршруту и уровню
+конкурентности, печатает изменение p95 и пропускной способности
+и завершается с кодом 1, если что-то ухудшилось больше порога.
+
+    python -m benchmarks.compare benchmarks/results/old.json \\
+        benchmarks/results/new.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    """Загружает результаты, возвращает {(маршрут, конкурентность): замер}."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    return {(item["route"], item["concurrency"]): item
+            for item in data["results"]}
+
+
+def change(old: float, new: float) -> float:
+    """Возвращает изменение в процентах."""
+    return (new - old) / old * 100 if old else 0.0
+
+
+def main() -> int:
+    """Стартовая функция сравнения, возвращает код завершения."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="допустимое ухудшение в процентах")
+    args = parser.parse_args()
+    old, new = load(args.old), load(args.new)
+
+    regressions = 0
+    print(f"{'маршрут':<36}{'conc':>5}{'p95 мс':>20}{'rps':>22}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        p95 = change(before["p95_ms"], after["p95_ms"])
+        rps = change(before["throughput_rps"], after["throughput_rps"])
+        worse = p95 > args.threshold or -rps > args.threshold
+        regressions += worse
+        print(f"{key[0]:<36}{key[1]:>5}"
+              f"{before['p95_ms']:>9} ->{after['p95_ms']:>9}"
+              f"{before['throughput_rps']:>10} ->{after['throughput_rps']:>9}"
+              f"  p95 {p95:+.1f}% rps {rps:+.1f}%"
+              f"{'  !' if worse else ''}")
+    print(f"Ухудшений больше {args.threshold}%: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
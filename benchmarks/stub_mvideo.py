@@ -0,0 +1,115 @@
+"""
+Локальная заглушка API магазина МВИДЕО для бенчмарков и тестов.
+
+Отдаёт фиксированные ответы в формате API МВИДЕО, поэтому бенчмарки
+не зависят от сети и лимитов магазина. Ответы помечаются ETag,
+на условный запрос с тем же If-None-Match заглушка отвечает 304.
+
+Routes:
+
+    /info/{product_id}: Общая информация о товаре (body.name и т.д.).
+    /price/{product_id}: Цена товара (body.materialPrices).
+
+С параметром fail_rate заглушка отвечает 429 (с Retry-After) или 503
+на заданную долю запросов - для проверки повторов и размыкателя цепи.
+
+Может работать отдельным процессом (для нагрузочных тестов):
+
+    python -m benchmarks.stub_mvideo [порт] [доля ошибок]
+
+Func:
+
+    start_stub: Запускает заглушку, возвращает (runner, базовый URL).
+"""
+import asyncio
+import hashlib
+import json
+import random
+import sys
+
+from aiohttp import web
+
+
+# Доля запросов, на которые заглушка отвечает 429/503
+FAIL_RATE = web.AppKey("fail_rate", float)
+
+
+@web.middleware
+async def failures(request: web.Request, handler) -> web.Response:
+    """Случайно отвечает 429/503 с вероятностью fail_rate."""
+    if random.random() < request.app[FAIL_RATE]:
+        if random.random() < 0.5:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        return web.Response(status=503)
+    return await handler(request)
+
+
+def _respond(request: web.Request, data: dict) -> web.Response:
+    """Отдаёт JSON с ETag или 304, если If-None-Match совпадает."""
+    body = json.dumps(data)
+    etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(text=body, content_type="application/json",
+                        headers={"ETag": etag})
+
+
+async def info(request: web.Request) -> web.Response:
+    """Возвращает общую информацию о товаре."""
+    product_id = request.match_info["product_id"]
+    return _respond(request, {"body": {
+        "productId": product_id,
+        "name": f"Товар {product_id}",
+        "description": "Описание товара " * 20,
+        "rating": {"star": round(random.uniform(3, 5), 1)}}})
+
+
+async def price(request: web.Request) -> web.Response:
+    """Возвращает цену товара."""
+    product_id = request.match_info["product_id"]
+    base = 1000 + int(product_id) % 1000
+    return _respond(request, {"body": {"materialPrices": [{
+        "productId": product_id,
+        "price": {"basePrice": base, "salePrice": base - 10}}]}})
+
+
+async def start_stub(host: str = "127.0.0.1", port: int = 8081,
+                     fail_rate: float = 0.0) -> tuple:
+    """
+    Функция запуска заглушки.
+
+    Args:
+
+        host: Адрес для прослушивания.
+        port: Порт для прослушивания.
+        fail_rate: Доля запросов, на которые отвечать 429/503.
+
+    Returns:
+
+        Возвращает (runner, базовый URL), runner нужно
+        остановить через await runner.cleanup().
+    """
+    stub = web.Application(middlewares=[failures])
+    stub[FAIL_RATE] = fail_rate
+    stub.add_routes([web.get("/info/{product_id}", info),
+                     web.get("/price/{product_id}", price)])
+    runner = web.AppRunner(stub, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner, f"http://{host}:{port}"
+
+
+async def main() -> None:
+    """Стартовая функция отдельного процесса заглушки."""
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    fail_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    runner, base_url = await start_stub(port=port, fail_rate=fail_rate)
+    print("Заглушка МВИДЕО:", base_url)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
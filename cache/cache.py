@@ -0,0 +1,228 @@
+"""
+Модуль кэширования ответов маршрутов чтения.
+
+Двухуровневый кэш: локальный LRU с TTL в памяти процесса и необязательный
+общий уровень (Redis-совместимый сервер по CACHE_REDIS_URL). Кэш делится
+на области (scope): "list" - список товаров, "product:{id}" - история цен
+товара. Инвалидация области - O(1): увеличивается её версия, и старые
+записи становятся недостижимы (и вытесняются по LRU/TTL).
+
+Classes:
+
+    TTLCache: Локальный LRU кэш с ограничением по времени жизни записей.
+
+    MemoryBackend: Реализация общего уровня в памяти с интерфейсом
+        подмножества Redis (get/set/incr). Заменяет Redis локально.
+
+    ResponseCache: Двухуровневый кэш ответов со счётчиками
+        попаданий и промахов.
+
+Func:
+
+    product_scope: Возвращает имя области кэша для товара.
+"""
+import json
+import time
+from collections import OrderedDict
+
+from config import (CACHE_ENABLED, CACHE_TTL, CACHE_MAX_ITEMS,
+                    CACHE_REDIS_URL)
+
+
+class TTLCache:
+    """
+    Локальный LRU кэш с ограничением по времени жизни записей.
+
+    Args:
+
+        max_items: Максимальное количество записей.
+        ttl: Время жизни записи в секундах.
+    """
+
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def get(self, key: str):
+        """Возвращает значение по ключу или None."""
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value) -> None:
+        """Сохраняет значение, вытесняя самые старые записи."""
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._items.clear()
+
+
+class MemoryBackend:
+    """Общий уровень кэша в памяти (подмножество команд Redis)."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, key: str):
+        """Возвращает значение по ключу или None."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires is not None and expires < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value, ex: int | None = None) -> None:
+        """Сохраняет значение, ex - время жизни в секундах."""
+        expires = time.monotonic() + ex if ex else None
+        self._data[key] = (value, expires)
+
+    async def incr(self, key: str) -> int:
+        """Увеличивает числовое значение на 1, возвращает новое."""
+        value = int((await self.get(key)) or 0) + 1
+        self._data[key] = (value, None)
+        return value
+
+
+def product_scope(product_id: int) -> str:
+    """Функция получения имени области кэша для товара."""
+    return f"product:{product_id}"
+
+
+class ResponseCache:
+    """
+    Двухуровневый кэш ответов маршрутов чтения.
+
+    Args:
+
+        ttl: Время жизни записи в секундах (на обоих уровнях).
+        max_items: Размер локального LRU кэша.
+        backend: Общий уровень (клиент Redis или MemoryBackend),
+            None - только локальный кэш.
+        enabled: Включён ли кэш.
+
+    Notes:
+
+        Инвалидация сразу действует в текущем процессе, а через общий
+        уровень - во всех процессах; устаревание локальных записей
+        других процессов ограничено ttl.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL,
+                 max_items: int = CACHE_MAX_ITEMS,
+                 backend=None, enabled: bool = CACHE_ENABLED):
+        self.ttl = ttl
+        self.backend = backend
+        self.enabled = enabled
+        self.local = TTLCache(max_items=max_items, ttl=ttl)
+        self._versions = {}
+        self.counters = {"hits_local": 0, "hits_shared": 0, "misses": 0}
+
+    def _local_key(self, scope: str, params: str) -> str:
+        """Собирает ключ локальной записи с учётом версии области."""
+        return f"{scope}:v{self._versions.get(scope, 0)}:{params}"
+
+    async def _shared_key(self, scope: str, params: str) -> str:
+        """Собирает ключ общей записи с учётом общей версии области."""
+        version = await self.backend.get(f"cache:ver:{scope}")
+        return f"cache:{scope}:v{int(version or 0)}:{params}"
+
+    async def get(self, scope: str, params: str):
+        """
+        Функция получения ответа из кэша.
+
+        Args:
+
+            scope: Область кэша ("list" или product_scope(id)).
+            params: Строка параметров запроса.
+
+        Returns:
+
+            Возвращает сохранённый ответ или None при промахе.
+        """
+        if not self.enabled:
+            return None
+        local_key = self._local_key(scope, params)
+        value = self.local.get(local_key)
+        if value is not None:
+            self.counters["hits_local"] += 1
+            return value
+        if self.backend is not None:
+            raw = await self.backend.get(
+                await self._shared_key(scope, params))
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(local_key, value)
+                self.counters["hits_shared"] += 1
+                return value
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, scope: str, params: str, value) -> None:
+        """
+        Функция сохранения ответа в кэш.
+
+        Args:
+
+            scope: Область кэша ("list" или product_scope(id)).
+            params: Строка параметров запроса.
+            value: Ответ, приведённый к JSON-совместимому виду.
+        """
+        if not self.enabled:
+            return
+        self.local.set(self._local_key(scope, params), value)
+        if self.backend is not None:
+            await self.backend.set(await self._shared_key(scope, params),
+                                   json.dumps(value), ex=int(self.ttl))
+
+    async def invalidate(self, *scopes: str) -> None:
+        """
+        Функция инвалидации областей кэша.
+
+        Args:
+
+            scopes: Области кэша ("list" или product_scope(id)).
+        """
+        if not self.enabled:
+            return
+        for scope in scopes:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            if self.backend is not None:
+                await self.backend.incr(f"cache:ver:{scope}")
+
+    def stats(self) -> dict:
+        """Функция получения счётчиков попаданий и промахов кэша."""
+        requests = sum(self.counters.values())
+        hits = self.counters["hits_local"] + self.counters["hits_shared"]
+        return {**self.counters,
+                "hit_ratio": round(hits / requests, 3) if requests else 0.0}
+
+
+def _make_backend():
+    """Создаёт общий уровень кэша согласно настройкам."""
+    if not CACHE_REDIS_URL:
+        return None
+    if CACHE_REDIS_URL == "memory://":
+        return MemoryBackend()
+    try:
+        from redis import asyncio as redis_asyncio
+    except ImportError:
+        raise RuntimeError(
+            "Для CACHE_REDIS_URL требуется пакет redis (pip install redis).")
+    return redis_asyncio.from_url(CACHE_REDIS_URL)
+
+
+response_cache = ResponseCache(backend=_make_backend())
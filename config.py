@@ -10,4 +10,123 @@ DB_HOST = os.environ.get("DB_HOST")
 DB_NAME = os.environ.get("DB_NAME")
 
 # Настройки приложения
-SECRET_KEY = os.environ.get("SECRET_KEY")
\ No newline at end of file
+SECRET_KEY = os.environ.get("SECRET_KEY")
+
+# Настройки модуля мониторинга цен
+MONITORING_ENABLED = os.environ.get("MONITORING_ENABLED", "0") == "1"
+MONITORING_INTERVAL = int(os.environ.get("MONITORING_INTERVAL", 3600))
+MONITORING_CONCURRENCY = int(os.environ.get("MONITORING_CONCURRENCY", 50))
+MONITORING_BATCH_SIZE = int(os.environ.get("MONITORING_BATCH_SIZE", 500))
+
+# Распределение мониторинга между обработчиками (процессами, узлами):
+# идентификатор обработчика (по умолчанию хост:pid) и срок аренды
+# пакета товаров в секундах, после которого товары упавшего
+# обработчика забирают остальные
+MONITORING_WORKER_ID = os.environ.get("MONITORING_WORKER_ID")
+MONITORING_LEASE_TTL = int(os.environ.get("MONITORING_LEASE_TTL", 300))
+
+# Хранение истории цен: секционирование по месяцам и срок хранения
+# сырых записей (0 - хранить всё), после которого они сворачиваются по дням
+HISTORY_PARTITIONING = os.environ.get("HISTORY_PARTITIONING", "0") == "1"
+HISTORY_PARTITIONS_AHEAD = int(os.environ.get("HISTORY_PARTITIONS_AHEAD", 2))
+HISTORY_RAW_RETENTION_DAYS = int(
+    os.environ.get("HISTORY_RAW_RETENTION_DAYS", 0))
+
+# Режим записи истории цен: "changes" - только изменения цены,
+# "all" - каждое получение цены
+HISTORY_RECORD_MODE = os.environ.get("HISTORY_RECORD_MODE", "changes")
+
+# Число одновременных запросов к магазину при пакетном добавлении товаров
+ADD_PRODUCTS_CONCURRENCY = int(os.environ.get("ADD_PRODUCTS_CONCURRENCY", 50))
+
+# Настройки HTTP клиента для запросов к API магазина
+HTTP_LIMIT = int(os.environ.get("HTTP_LIMIT", 100))
+HTTP_LIMIT_PER_HOST = int(os.environ.get("HTTP_LIMIT_PER_HOST", 20))
+HTTP_DNS_TTL = int(os.environ.get("HTTP_DNS_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 15))
+
+# JSON-бэкенд для разбора ответов магазина: auto (orjson/ujson/json),
+# orjson, ujson или json
+JSON_PARSER = os.environ.get("JSON_PARSER", "auto")
+
+# Ограничение частоты запросов к одному хосту (запросов в секунду),
+# повторы с экспоненциальной задержкой и размыкатель цепи. Ограничение
+# общее для мониторинга и маршрутов добавления товаров: add_products
+# на N товаров занимает не меньше (N - FETCH_BURST) / FETCH_RATE_PER_HOST
+# секунд
+FETCH_RATE_PER_HOST = float(os.environ.get("FETCH_RATE_PER_HOST", 10))
+FETCH_RATE_MIN = float(os.environ.get("FETCH_RATE_MIN", 0.5))
+FETCH_BURST = int(os.environ.get("FETCH_BURST", 20))
+FETCH_MAX_RETRIES = int(os.environ.get("FETCH_MAX_RETRIES", 4))
+FETCH_BACKOFF_BASE = float(os.environ.get("FETCH_BACKOFF_BASE", 0.5))
+FETCH_BACKOFF_MAX = float(os.environ.get("FETCH_BACKOFF_MAX", 30))
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", 10))
+BREAKER_RESET = float(os.environ.get("BREAKER_RESET", 60))
+
+# Кэш ETag/Last-Modified и тел ответов для условных запросов к магазину:
+# общий объём тел в байтах (на процесс) и максимальный размер одного
+# тела - большие ответы (информация о товаре) не кэшируются, их
+# запрашивают один раз при добавлении товара
+UPSTREAM_CACHE_BYTES = int(os.environ.get("UPSTREAM_CACHE_BYTES",
+                                          32 * 1024 * 1024))
+UPSTREAM_CACHE_MAX_BODY = int(os.environ.get("UPSTREAM_CACHE_MAX_BODY", 8192))
+
+# Кэш ответов маршрутов чтения: время жизни записей, размер локального
+# кэша и адрес общего уровня (redis://..., "memory://" - в памяти процесса)
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") == "1"
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 60))
+CACHE_MAX_ITEMS = int(os.environ.get("CACHE_MAX_ITEMS", 10000))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+
+# Размер пакета строк при потоковой выгрузке истории цен
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 5000))
+
+# Метрики производительности в формате Prometheus (маршрут /metrics,
+# требуется пакет prometheus_client)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+# Пул соединений с базой данных: размер, превышение, время жизни
+# соединения (сек), проверка соединения перед выдачей и размер кэша
+# подготовленных запросов asyncpg (0 - для pgbouncer в режиме transaction)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+
+# Реплика для маршрутов чтения (host[:port], те же пользователь и база),
+# не задана - все запросы идут в основную базу
+DB_REPLICA_HOST = os.environ.get("DB_REPLICA_HOST")
+
+# Планировщик мониторинга: каждый товар проверяется в свой срок
+# (products.next_poll_at) с интервалом products.poll_interval или
+# MONITORING_INTERVAL, со случайным разбросом +-MONITORING_JITTER доли
+# интервала; обработчик проверяет очередь раз в MONITORING_TICK секунд
+MONITORING_JITTER = float(os.environ.get("MONITORING_JITTER", 0.1))
+MONITORING_TICK = float(os.environ.get("MONITORING_TICK", 5))
+MONITORING_MIN_INTERVAL = int(os.environ.get("MONITORING_MIN_INTERVAL", 60))
+
+# Запуск приложения (python main.py): адрес, порт, число воркеров uvicorn,
+# перезагрузка при изменении кода (только для разработки, без воркеров),
+# создание и миграция схемы при старте и число заранее открываемых
+# соединений с базой
+APP_HOST = os.environ.get("APP_HOST", "0.0.0.0")
+APP_PORT = int(os.environ.get("APP_PORT", 8000))
+APP_WORKERS = int(os.environ.get("APP_WORKERS", 1))
+APP_RELOAD = os.environ.get("APP_RELOAD", "0") == "1"
+SCHEMA_SETUP = os.environ.get("SCHEMA_SETUP", "1") == "1"
+DB_WARMUP_CONNECTIONS = int(os.environ.get("DB_WARMUP_CONNECTIONS", 2))
+
+# Оповещения о снижении цен: получатель ("log" - в журнал, "memory" -
+# в память процесса для проверки, "webhook" - POST на ALERT_WEBHOOK_URL)
+# и таймаут запроса к нему (сек), как часто (сек) проверять версию
+# подписок для обновления индекса, сколько неотправленных оповещений
+# хранить для повторной отправки
+ALERT_SINK = os.environ.get("ALERT_SINK", "log")
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL")
+ALERT_WEBHOOK_TIMEOUT = float(os.environ.get("ALERT_WEBHOOK_TIMEOUT", 10))
+ALERT_REFRESH_INTERVAL = float(os.environ.get("ALERT_REFRESH_INTERVAL", 10))
+ALERT_MAX_PENDING = int(os.environ.get("ALERT_MAX_PENDING", 10000))
@@ -14,21 +14,46 @@ Models:
         цена на товар, время добавления цены, а так же связь
         с таблицей информации о продукте.
 
+    PriceHistoryDaily: Содержит дневные агрегаты цен (min/max/avg/last),
+        в которые сворачивается история старше срока хранения
+        (см. database.partitioning).
+
+    TableVersion: Содержит версию и время последнего изменения таблицы
+        (для ETag/Last-Modified списка товаров).
+
+    Subscription: Содержит подписку на снижение цены товара:
+        id, id товара, контакт для оповещения, порог цены
+        и/или процент снижения.
+
 Func:
 
     get_session: Создаёт асинхронную сессию,
         для работы с базой данных
+
+    get_read_session: Создаёт асинхронную сессию только для чтения
+        (на реплике, если задан DB_REPLICA_HOST, иначе на основной базе).
     
     create_tables: Создаёт таблицы в базе данных.
     delete_tables: Удаляет таблицы из базы данных.
+    migrate_tables: Применяет к существующим таблицам изменения схемы
+        (индексы и т.д.) без удаления данных.
+    schema_is_current: Проверяет одним запросом, применены ли
+        все миграции.
+    schema_lock: Блокировка изменения схемы между процессами.
+    warm_up: Заранее открывает соединения в пулах движков.
 
     add_item_info: Получает на вход:
         название товара, описание товара, рейтинг товара,
         URL от API с общей информацией о товаре,
-        URL от API с информацией о цене товара, объект сессии,
+        URL от API с информацией о цене товара,
+        интервал мониторинга (необязательно), объект сессии,
         сохраняет эти данные в базу, возвращает сообщение об
         успехе или ошибке и статус код.
 
+    add_items_info: Получает на вход: список словарей с информацией
+        о товарах и объект сессии, сохраняет все товары одним
+        многострочным INSERT, возвращает их id и статус код.
+
     delete_item: Получает на вход: id товара и объект сессии,
         удаляет товар из базы данных, возвращает сообщение об
         успехе или ошибке и статус код.
@@ -37,31 +62,208 @@ Func:
         проверяет наличие товара в базе данных, 
         возвращает булево значение True если товар есть в базе, иначе False.
 
-    select_history_price: Получает на вход: id товара и объект сессии,
-        возвращает историю цен на заданый товар и статус код(dict).
+    select_history_price: Получает на вход: id товара, границы периода,
+        лимит, интервал агрегации и объект сессии, возвращает историю цен
+        на заданый товар (или агрегаты по интервалам) и статус код(dict).
+
+    select_all_item: Получает на вход: курсор (id последнего товара
+        предыдущей страницы), размер страницы, список полей и объект сессии,
+        возвращает страницу товаров на мониторинге и курсор следующей(dict).
+
+    claim_products: Получает на вход: идентификатор обработчика,
+        размер пакета, срок аренды и объект сессии, арендует пакет товаров,
+        срок проверки которых наступил, и возвращает список
+        (id товара, URL от API с ценой, последняя цена).
+
+    release_leases: Получает на вход: идентификатор обработчика и объект
+        сессии, снимает аренду со всех его товаров.
+
+    set_poll_interval: Получает на вход: id товара, интервал проверки
+        цены и объект сессии, задаёт товару собственный интервал
+        мониторинга, возвращает сообщение и статус код.
+
+    stream_history: Получает на вход: список id товаров (или None - все)
+        и размер пакета, построчно читает историю цен (вместе с дневными
+        агрегатами свёрнутых дней) серверным курсором и отдаёт её
+        пакетами строк.
 
-    select_all_item: Получает на вход: объект сессии, возвращает
-        все товары, находящиеся в базе данных то есть на мониторинге(dict).
+    select_list_version: Получает на вход: объект сессии, возвращает
+        версию и время последнего изменения таблицы товаров(dict).
+
+    select_history_version: Получает на вход: id товара и объект сессии,
+        возвращает время последнего изменения истории цен товара(dict).
+
+    add_subscription: Получает на вход: id товара, контакт, порог цены,
+        процент снижения и объект сессии, добавляет подписку,
+        возвращает её id и статус код.
+
+    delete_subscription: Получает на вход: id подписки и объект сессии,
+        удаляет подписку, возвращает сообщение и статус код.
+
+    select_subscriptions: Получает на вход: объект сессии, возвращает
+        все подписки (id, id товара, контакт, порог, процент снижения).
+
+    select_table_version: Получает на вход: название таблицы и объект
+        сессии, возвращает номер её версии.
+
+    record_prices: Получает на вход: список полученных цен товаров,
+        идентификатор обработчика и объект сессии, записывает в историю
+        только изменившиеся цены (HISTORY_RECORD_MODE=changes) товаров,
+        аренда которых ещё за обработчиком, отмечает время их проверки,
+        снимает с них аренду и назначает следующий срок проверки.
+
+Время функций работы с данными (@observe_db), SQL запросов и ожидания
+соединения из пула записывается в метрики (metrics.metrics).
 """
-from typing import AsyncGenerator
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, AsyncIterator
 from fastapi import Depends
-from sqlalchemy import (Column, DateTime, ForeignKey,
-                        Integer, String, Float, select)
+from sqlalchemy import (Column, Date, DateTime, ForeignKey, Index, text,
+                        Integer, String, Float, select, insert,
+                        literal_column, literal, cast, union_all, update,
+                        delete, false, true)
+from sqlalchemy.dialects.postgresql import (aggregate_order_by, array_agg,
+                                            insert as pg_insert)
 from sqlalchemy.ext.asyncio import (
     create_async_engine, AsyncSession)
 from sqlalchemy.orm import sessionmaker, relationship, DeclarativeBase
 from sqlalchemy import func
 
-from config import (DB_USER, DB_PASS, DB_HOST, DB_NAME)
+from cache.cache import response_cache, product_scope
+from metrics.metrics import instrument_engine, observe_db, pool_class
+from config import (DB_USER, DB_PASS, DB_HOST, DB_NAME, DB_REPLICA_HOST,
+                    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                    DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+                    DB_STATEMENT_CACHE_SIZE,
+                    HISTORY_RECORD_MODE, EXPORT_CHUNK_SIZE,
+                    MONITORING_INTERVAL, MONITORING_JITTER)
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
-engine = create_async_engine(DATABASE_URL)
+
+
+def _create_engine(url: str, pool: str):
+    """Создаёт движок с настройками пула и хуками метрик."""
+    new_engine = create_async_engine(
+        url,
+        poolclass=pool_class(pool),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE})
+    instrument_engine(new_engine)
+    return new_engine
+
+
+engine = _create_engine(DATABASE_URL, "primary")
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False
 )
 
+if DB_REPLICA_HOST:
+    replica_engine = _create_engine(
+        f"postgresql+asyncpg://{DB_USER}:{DB_PASS}"
+        f"@{DB_REPLICA_HOST}/{DB_NAME}", "replica")
+    ReadSessionLocal = sessionmaker(
+        bind=replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+else:
+    replica_engine = engine
+    ReadSessionLocal = AsyncSessionLocal
+
+
+# Поля товара, доступные в списке товаров на мониторинге
+PRODUCT_FIELDS = ("id", "name", "description", "rating")
+
+# Интервалы агрегации истории цен (аргумент date_trunc PostgreSQL)
+HISTORY_BUCKETS = ("hour", "day", "week", "month")
+
+# Первый срок проверки товара - случайный момент в пределах интервала
+# мониторинга, чтобы проверки товаров распределялись равномерно
+FIRST_POLL_SQL = (
+    f"now() + random() * interval '{MONITORING_INTERVAL} seconds'")
+
+# Следующий срок проверки: интервал товара (или общий) с разбросом
+NEXT_POLL_SQL = (
+    "now() + make_interval(secs => "
+    f"coalesce(poll_interval, {MONITORING_INTERVAL}) "
+    f"* (1 + {MONITORING_JITTER} * (2 * random() - 1)))")
+
+# Ключ advisory lock изменения схемы (create_tables, migrate_tables)
+# и интервал опроса блокировки (сек) процессами, ожидающими её
+SCHEMA_LOCK = 7_301_002
+SCHEMA_LOCK_POLL = 0.5
+
+# Изменения схемы для уже развёрнутых баз (см. migrate_tables),
+# каждый запрос должен быть идемпотентным. Внешние ключи добавляются
+# NOT VALID и проверяются отдельным VALIDATE CONSTRAINT, который
+# не блокирует запись в таблицу на время проверки строк (для уже
+# проверенного ключа VALIDATE ничего не делает)
+MIGRATIONS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+    "ix_price_history_product_id_timestamp "
+    "ON price_history (product_id, timestamp)",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS last_price "
+    "double precision",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS last_checked_at "
+    "timestamp without time zone",
+    # Секционированная таблица (HISTORY_PARTITIONING, если секционирование
+    # выполнено раньше этой миграции) не поддерживает NOT VALID до
+    # PostgreSQL 18: ключ с ON DELETE CASCADE ей создаёт partition_tables,
+    # иначе он добавляется с проверкой сразу
+    "DO $$ BEGIN "
+    "IF (SELECT relkind FROM pg_class "
+    "WHERE oid = 'price_history'::regclass) <> 'p' THEN "
+    "ALTER TABLE price_history "
+    "DROP CONSTRAINT IF EXISTS price_history_product_id_fkey, "
+    "ADD CONSTRAINT price_history_product_id_fkey FOREIGN KEY (product_id) "
+    "REFERENCES products (id) ON DELETE CASCADE NOT VALID; "
+    "ELSIF NOT EXISTS (SELECT 1 FROM pg_constraint "
+    "WHERE conrelid = 'price_history'::regclass "
+    "AND conname = 'price_history_product_id_fkey' "
+    "AND confdeltype = 'c') THEN "
+    "ALTER TABLE price_history "
+    "DROP CONSTRAINT IF EXISTS price_history_product_id_fkey, "
+    "ADD CONSTRAINT price_history_product_id_fkey FOREIGN KEY (product_id) "
+    "REFERENCES products (id) ON DELETE CASCADE; "
+    "END IF; END $$",
+    "ALTER TABLE price_history "
+    "VALIDATE CONSTRAINT price_history_product_id_fkey",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS lease_owner varchar",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS poll_interval integer",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS next_poll_at "
+    "timestamp without time zone",
+    f"UPDATE products SET next_poll_at = {FIRST_POLL_SQL} "
+    "WHERE next_poll_at IS NULL",
+    "ALTER TABLE products "
+    f"ALTER COLUMN next_poll_at SET DEFAULT {FIRST_POLL_SQL}, "
+    "ALTER COLUMN next_poll_at SET NOT NULL",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_next_poll_at "
+    "ON products (next_poll_at)",
+    "CREATE TABLE IF NOT EXISTS alert_subscriptions ("
+    " id serial PRIMARY KEY,"
+    " product_id integer NOT NULL"
+    " REFERENCES products (id) ON DELETE CASCADE,"
+    " contact varchar NOT NULL,"
+    " threshold double precision,"
+    " drop_percent double precision,"
+    " created_at timestamp without time zone DEFAULT now())",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+    "ix_alert_subscriptions_product_id "
+    "ON alert_subscriptions (product_id)",
+]
+
 
 class Base(DeclarativeBase):
     pass
@@ -79,10 +281,24 @@ class Product(Base):
         rating: Рейтинг товара.
         url_info: Ссылка на API с общей информацией о товаре.
         url_price: Ссылка на API с информацией о цене товара.
+        last_price: Последняя записанная цена товара.
+        last_checked_at: Время последней успешной проверки цены.
+        lease_owner: Обработчик мониторинга, арендовавший товар.
+        poll_interval: Интервал мониторинга товара в секундах
+            (None - MONITORING_INTERVAL).
+        next_poll_at: Срок следующей проверки цены (на время аренды -
+            время её окончания).
         price_history: Связь с таблицей истории цен на товар.
+
+    Notes:
+
+        Индекс по next_poll_at обслуживает выборку товаров,
+        срок проверки которых наступил.
     """
     __tablename__ = "products"
-    
+    __table_args__ = (
+        Index("ix_products_next_poll_at", "next_poll_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -90,10 +306,17 @@ class Product(Base):
     rating = Column(Float)
     url_info = Column(String, nullable=False)
     url_price = Column(String, nullable=False)
+    last_price = Column(Float)
+    last_checked_at = Column(DateTime)
+    lease_owner = Column(String)
+    poll_interval = Column(Integer)
+    next_poll_at = Column(DateTime, nullable=False,
+                          server_default=text(FIRST_POLL_SQL))
 
     price_history = relationship("PriceHistory",
                                  back_populates="product",
-                                 cascade="all, delete")
+                                 cascade="all, delete",
+                                 passive_deletes=True)
 
 
 class PriceHistory(Base):
@@ -107,17 +330,113 @@ class PriceHistory(Base):
         price: Цена продукта.
         timestamp: Время добавления цены.
         product: Связь с таблицей общей информации о продукте.
+
+    Notes:
+
+        Составной индекс (product_id, timestamp) обслуживает выборку истории
+        товара за период и каскадное удаление товара без полного
+        сканирования таблицы.
     """
     __tablename__ = "price_history"
+    __table_args__ = (
+        Index("ix_price_history_product_id_timestamp",
+              "product_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    product_id = Column(Integer,
+                        ForeignKey('products.id', ondelete="CASCADE"),
+                        nullable=False)
     price = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=func.now())
 
     product = relationship("Product", back_populates="price_history")
 
 
+class PriceHistoryDaily(Base):
+    """
+    Таблица дневных агрегатов истории цен.
+
+    Args:
+
+        product_id: id продукта.
+        day: День, за который посчитаны агрегаты.
+        min: Минимальная цена за день.
+        max: Максимальная цена за день.
+        avg: Средняя цена за день.
+        last: Последняя цена за день.
+        samples: Количество исходных записей за день.
+    """
+    __tablename__ = "price_history_daily"
+
+    product_id = Column(Integer,
+                        ForeignKey('products.id', ondelete="CASCADE"),
+                        primary_key=True)
+    day = Column(Date, primary_key=True)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    avg = Column(Float, nullable=False)
+    last = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+
+
+class TableVersion(Base):
+    """
+    Таблица версий таблиц.
+
+    Args:
+
+        name: Название таблицы.
+        version: Номер версии, увеличивается при каждом изменении.
+        updated_at: Время последнего изменения.
+    """
+    __tablename__ = "table_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class Subscription(Base):
+    """
+    Таблица подписок на снижение цены товаров.
+
+    Args:
+
+        id: id подписки.
+        product_id: id продукта.
+        contact: Куда отправлять оповещение (адрес, id чата и т.д.).
+        threshold: Оповестить, когда цена опустится до порога или ниже.
+        drop_percent: Оповестить, когда цена снизится на столько
+            процентов или больше относительно предыдущей.
+        created_at: Время создания подписки.
+    """
+    __tablename__ = "alert_subscriptions"
+    __table_args__ = (
+        Index("ix_alert_subscriptions_product_id", "product_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer,
+                        ForeignKey('products.id', ondelete="CASCADE"),
+                        nullable=False)
+    contact = Column(String, nullable=False)
+    threshold = Column(Float)
+    drop_percent = Column(Float)
+    created_at = Column(DateTime, default=func.now())
+
+
+async def _bump_version(name: str, session: AsyncSession) -> None:
+    """Увеличивает версию таблицы в текущей транзакции."""
+    now = datetime.now()
+    await session.execute(
+        pg_insert(TableVersion)
+        .values(name=name, version=1, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=[TableVersion.name],
+            set_={"version": TableVersion.version + 1, "updated_at": now}))
+
+
 async def create_tables() -> None:
     """Функция создания таблиц."""
     async with engine.begin() as conn:
@@ -130,15 +449,132 @@ async def delete_tables() -> None:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+async def migrate_tables() -> None:
+    """
+    Функция миграции схемы базы данных.
+
+    Notes:
+
+        Выполняет по порядку ещё не применённые DDL-запросы из MIGRATIONS
+        (номер миграции - её позиция в списке, начиная с 1) и запоминает
+        их в таблице schema_migrations, поэтому её можно запускать
+        при каждом старте. Запросы выполняются в режиме AUTOCOMMIT,
+        чтобы индексы строились CONCURRENTLY, не блокируя запись в таблицы.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(version integer PRIMARY KEY)"))
+        result = await conn.execute(text(
+            "SELECT version FROM schema_migrations"))
+        applied = set(result.scalars())
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            if version in applied:
+                continue
+            await conn.execute(text(migration))
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:v)"),
+                {"v": version})
+
+
+async def schema_is_current() -> bool:
+    """
+    Функция проверки схемы базы данных.
+
+    Returns:
+
+        Возвращает True, если все миграции из MIGRATIONS уже применены
+        (значит, таблицы созданы), иначе False.
+    """
+    async with engine.connect() as conn:
+        # Отдельным запросом: имя таблицы в подзапросе разбирается
+        # до выполнения, и без таблицы запрос упал бы целиком
+        result = await conn.execute(text(
+            "SELECT to_regclass('schema_migrations') IS NOT NULL"))
+        if not result.scalar():
+            return False
+        result = await conn.execute(text(
+            "SELECT count(*) FROM schema_migrations"))
+        return result.scalar() >= len(MIGRATIONS)
+
+
+@asynccontextmanager
+async def schema_lock():
+    """
+    Блокировка изменения схемы (advisory lock на время блока).
+
+    Notes:
+
+        Процессы (воркеры uvicorn, реплики приложения), стартующие
+        одновременно, меняют схему по очереди, а не параллельно.
+
+        Блокировка берётся на соединении без транзакции (AUTOCOMMIT)
+        опросом pg_try_advisory_lock: ни владелец, ни ожидающие
+        не держат открытую транзакцию со снимком, которого
+        иначе бесконечно ждал бы CREATE INDEX CONCURRENTLY в миграциях.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        while not (await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": SCHEMA_LOCK})).scalar():
+            await asyncio.sleep(SCHEMA_LOCK_POLL)
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"),
+                               {"key": SCHEMA_LOCK})
+
+
+async def warm_up(connections: int) -> None:
+    """
+    Функция прогрева пулов соединений.
+
+    Args:
+
+        connections: Количество соединений, открываемых заранее
+            в пуле основной базы и реплики.
+
+    Notes:
+
+        Соединения открываются одновременно и возвращаются в пул, поэтому
+        первые запросы не ждут установки соединения и аутентификации.
+    """
+    async def touch(target) -> None:
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(touch(target)
+                           for target in {engine, replica_engine}
+                           for _ in range(connections)))
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Функция получения асинхронной сессии."""
     async with AsyncSessionLocal() as session:
-            yield session
+        yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Функция получения асинхронной сессии только для чтения.
+
+    Notes:
+
+        При заданном DB_REPLICA_HOST сессия открывается на реплике,
+        и чтение не конкурирует за пул основной базы с записью цен.
+        Реплика может отставать: сразу после изменения маршрут чтения
+        может вернуть (и закэшировать не дольше CACHE_TTL) прежние данные.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
 
 
+@observe_db
 async def add_item_info(name: str, description: str,
                         rating: float, url_info: str,
-                        url_price: str,
+                        url_price: str, poll_interval: int | None = None,
                         session: AsyncSession = Depends(get_session)) -> dict:
     """
     Функция добавления товара.
@@ -150,6 +586,8 @@ async def add_item_info(name: str, description: str,
         rating: Рейтинг товара.
         url_info: Ссылка на API с общей информацией о товаре.
         url_price: Ссылка на API с информацией о цене товара.
+        poll_interval: Интервал мониторинга товара в секундах
+            (None - MONITORING_INTERVAL).
         session: Асинхронная сессия для базы данных.
     
     Returns:
@@ -158,16 +596,56 @@ async def add_item_info(name: str, description: str,
         возвращает сообщение об успехе или ошибке и статус код.
     """
     result = Product(name=name, description=description,
-                    rating=rating, url_info=url_info, url_price=url_price)
+                    rating=rating, url_info=url_info, url_price=url_price,
+                    poll_interval=poll_interval)
     try:
         session.add(result)
+        await _bump_version("products", session)
         await session.commit()
+        await response_cache.invalidate("list")
         return {"message": f"Товар {name} добавлен!", "status_code": 200}
     except Exception as ex:
         return {"message": f"Проблемы с добавлением товара: {ex}",
                 "status_code": 422}
 
 
+@observe_db
+async def add_items_info(items: list,
+                         session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция пакетного добавления товаров.
+
+    Args:
+
+        items: Список словарей с ключами name, description, rating,
+            url_info, url_price, poll_interval.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Добавляет все товары одним INSERT-запросом в одной транзакции,
+        возвращает список id добавленных товаров (в порядке items)
+        и статус код, иначе сообщение об ошибке и статус код.
+    """
+    if not items:
+        return {"message": [], "status_code": 200}
+    try:
+        result = await session.scalars(
+            insert(Product).returning(Product.id,
+                                      sort_by_parameter_order=True),
+            items)
+        ids = list(result)
+        await _bump_version("products", session)
+        await session.commit()
+        await response_cache.invalidate("list")
+        return {"message": ids, "status_code": 200}
+    except Exception as ex:
+        await session.rollback()
+        return {"message": f"Проблемы с добавлением товаров: {ex}",
+                "status_code": 422}
+
+
+@observe_db
 async def delete_item(product_id: int,
                       session: AsyncSession = Depends(get_session)) -> dict:
     """
@@ -180,25 +658,37 @@ async def delete_item(product_id: int,
     
     Notes:
 
-        Удаляет товар и его историю цен по переданному id,
-        возвращает сообщение об успехе или ошибке и статус код.
+        Удаляет товар одним запросом DELETE ... RETURNING, история цен
+        удаляется каскадно на стороне базы (ON DELETE CASCADE),
+        без загрузки записей в Python. Возвращает сообщение об успехе
+        или ошибке и статус код (404, если товара нет).
 
     """
-    result = await session.scalars(select(Product).filter_by(id=product_id))
     try:
-        product = result.first()
-        if product:
-            await session.delete(product)
-            await session.commit()
-            return {"message": f"Товар с id: {product_id} удалён!",
-                    "status_code": 200}
+        result = await session.execute(
+            delete(Product)
+            .where(Product.id == product_id)
+            .returning(Product.id))
+        deleted = result.scalar()
+        if deleted is None:
+            await session.rollback()
+            return {"message": "Товар не найден в базе данных.",
+                    "status_code": 404}
+        await _bump_version("products", session)
+        await session.commit()
+        await response_cache.invalidate("list", product_scope(product_id))
+        return {"message": f"Товар с id: {product_id} удалён!",
+                "status_code": 200}
     except Exception as ex:
+        await session.rollback()
         return {"message": f"Проблемы с удалением товара: {ex}",
                 "status_code": 422}
 
 
-async def select_item(product_id: int,
-                      session: AsyncSession = Depends(get_session)) -> bool:
+@observe_db
+async def select_item(
+        product_id: int,
+        session: AsyncSession = Depends(get_read_session)) -> bool:
     """
     Функция получения данных о товаре.
 
@@ -217,56 +707,760 @@ async def select_item(product_id: int,
     return bool(result.first())
 
 
+def _price_series(product_id: int, date_from: datetime | None,
+                  date_to: datetime | None):
+    """
+    Собирает ряд цен товара из сырой истории и дневных агрегатов.
+
+    Дни, свёрнутые политикой хранения, представлены одной точкой
+    (последней ценой дня) с сохранёнными min/max/суммой для агрегации.
+    При записи только изменений цена, действовавшая на начало периода,
+    добавляется точкой в date_from.
+    """
+    raw = [PriceHistory.product_id == product_id]
+    daily = [PriceHistoryDaily.product_id == product_id]
+    if date_from is not None:
+        raw.append(PriceHistory.timestamp >= date_from)
+        daily.append(PriceHistoryDaily.day >= date_from.date())
+    if date_to is not None:
+        raw.append(PriceHistory.timestamp < date_to)
+        daily.append(PriceHistoryDaily.day < date_to.date())
+    parts = [
+        select(PriceHistory.timestamp.label("timestamp"),
+               PriceHistory.price.label("price"),
+               PriceHistory.price.label("min_price"),
+               PriceHistory.price.label("max_price"),
+               PriceHistory.price.label("sum_price"),
+               literal_column("1").label("samples"))
+        .where(*raw),
+        select(cast(PriceHistoryDaily.day, DateTime),
+               PriceHistoryDaily.last,
+               PriceHistoryDaily.min,
+               PriceHistoryDaily.max,
+               PriceHistoryDaily.avg * PriceHistoryDaily.samples,
+               PriceHistoryDaily.samples)
+        .where(*daily)]
+    if HISTORY_RECORD_MODE == "changes" and date_from is not None:
+        raw_before = (
+            select(PriceHistory.timestamp, PriceHistory.price)
+            .where(PriceHistory.product_id == product_id,
+                   PriceHistory.timestamp < date_from)
+            .order_by(PriceHistory.timestamp.desc())
+            .limit(1).subquery())
+        daily_before = (
+            select(cast(PriceHistoryDaily.day, DateTime).label("timestamp"),
+                   PriceHistoryDaily.last.label("price"))
+            .where(PriceHistoryDaily.product_id == product_id,
+                   PriceHistoryDaily.day < date_from.date())
+            .order_by(PriceHistoryDaily.day.desc())
+            .limit(1).subquery())
+        before = union_all(select(raw_before), select(daily_before)).subquery()
+        carry = (select(before.c.price)
+                 .order_by(before.c.timestamp.desc())
+                 .limit(1).subquery())
+        parts.append(
+            select(literal(date_from, DateTime), carry.c.price,
+                   carry.c.price, carry.c.price, carry.c.price,
+                   literal_column("1")))
+    return union_all(*parts).subquery()
+
+
+def _naive_utc(date: datetime | None) -> datetime | None:
+    """
+    Приводит время с часовым поясом к UTC без пояса (как хранится
+    в базе), время без пояса возвращает как есть.
+    """
+    if date is None or date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _bucket_step(date: datetime, bucket: str) -> datetime:
+    """Возвращает начало следующего интервала агрегации."""
+    if bucket == "month":
+        return (date.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return date + {"hour": timedelta(hours=1),
+                   "day": timedelta(days=1),
+                   "week": timedelta(weeks=1)}[bucket]
+
+
+def _bucket_floor(date: datetime, bucket: str) -> datetime:
+    """Возвращает начало интервала агрегации (как date_trunc)."""
+    date = date.replace(minute=0, second=0, microsecond=0)
+    if bucket == "hour":
+        return date
+    date = date.replace(hour=0)
+    if bucket == "week":
+        return date - timedelta(days=date.weekday())
+    if bucket == "month":
+        return date.replace(day=1)
+    return date
+
+
+def _price_segments(points: list, until: datetime | None):
+    """
+    Переводит точки ряда цен в отрезки постоянной цены.
+
+    Отдаёт (начало, конец, цена, минимум, максимум, последняя цена):
+    сырая точка действует до следующей точки (последняя - до until),
+    свёрнутый день - весь день со средней ценой дня, а после него,
+    до следующей точки, - последняя цена дня.
+    """
+    for i, point in enumerate(points):
+        end = points[i + 1].timestamp if i + 1 < len(points) else \
+            max(until or point.timestamp, point.timestamp)
+        if point.samples > 1:
+            day_end = min(point.timestamp + timedelta(days=1), end)
+            yield (point.timestamp, day_end,
+                   point.sum_price / point.samples, point.min_price,
+                   point.max_price, point.price)
+            if end > day_end:
+                yield (day_end, end, point.price, point.price, point.price,
+                       point.price)
+        else:
+            yield (point.timestamp, end, point.price, point.price,
+                   point.price, point.price)
+
+
+def _aggregate_changes(product_id: int, points: list, bucket: str,
+                       until: datetime | None, limit: int) -> list:
+    """
+    Агрегирует историю, записанную только изменениями, по интервалам.
+
+    Цена действует до следующего изменения, поэтому каждый интервал
+    начинается с цены, перенесённой из предыдущего, min/max учитывают
+    её, а средняя взвешена по времени действия цены. Интервалы
+    без изменений заполняются перенесённой ценой до until (последней
+    проверки цены или конца периода, не включительно).
+    """
+    buckets = {}
+    for start, end, price, low, high, last in _price_segments(points, until):
+        date = start
+        while len(buckets) <= limit:
+            period = _bucket_floor(date, bucket)
+            next_period = _bucket_step(period, bucket)
+            part_end = min(end, next_period)
+            seconds = (part_end - date).total_seconds()
+            acc = buckets.setdefault(period, {
+                "min": low, "max": high, "weighted": 0.0, "seconds": 0.0,
+                "prices": [], "last": last})
+            acc["min"] = min(acc["min"], low)
+            acc["max"] = max(acc["max"], high)
+            acc["weighted"] += price * seconds
+            acc["seconds"] += seconds
+            acc["prices"].append(price)
+            acc["last"] = last
+            if end <= next_period:
+                break
+            date = next_period
+    history = []
+    for period, acc in list(buckets.items())[:limit]:
+        avg = acc["weighted"] / acc["seconds"] if acc["seconds"] else \
+            sum(acc["prices"]) / len(acc["prices"])
+        history.append({"product_id": product_id, "date": period,
+                        "min": acc["min"], "max": acc["max"],
+                        "avg": round(avg, 2), "last": acc["last"]})
+    return history
+
+
+@observe_db
 async def select_history_price(
         product_id: int,
-        session: AsyncSession = Depends(get_session)) -> dict:
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        limit: int = 1000,
+        bucket: str | None = None,
+        session: AsyncSession = Depends(get_read_session)) -> dict:
     """
     Функция получения истории цен товара.
 
     Args:
 
         product_id: id товара
+        date_from: Начало периода (включительно).
+        date_to: Конец периода (не включительно).
+        limit: Максимальное количество записей (или интервалов).
+        bucket: Размер интервала агрегации (из HISTORY_BUCKETS),
+            по умолчанию без агрегации.
         session: Асинхронная сессия для базы данных.
     
     Returns:
 
-        Возвращает историю цен на товар и время появления этих цен в базе,
-        так же возвращает статус код, иначе возвращает
-        сообщение об ошибке и статус кода.
+        Одним запросом проверяет наличие товара и выбирает историю,
+        возвращает историю цен на товар, время появления этих цен в базе
+        (по возрастанию времени) и время, до которого цена действовала
+        (until) - последние limit записей периода и признак truncated
+        (в периоде есть более ранние записи), а при заданном bucket -
+        минимальную, максимальную,
+        среднюю и последнюю цену за каждый интервал (при записи только
+        изменений - с учётом цены, перенесённой из предыдущего интервала,
+        средняя взвешена по времени действия цены).
+        Для дней старше срока хранения сырых записей используются
+        дневные агрегаты из price_history_daily. Так же
+        возвращает статус код (404, если товара нет), иначе возвращает
+        сообщение об ошибке и статус кода (подробности ошибки пишутся
+        в журнал, а не в ответ).
+
+    Notes:
+
+        Время с часовым поясом приводится к UTC без пояса.
     """
+    if bucket is not None and bucket not in HISTORY_BUCKETS:
+        return {"message": f"Недопустимый интервал агрегации: {bucket}",
+                "status_code": 422}
+    date_from, date_to = _naive_utc(date_from), _naive_utc(date_to)
+    truncated = False
+    series = _price_series(product_id, date_from, date_to)
     try:
-        result = await session.scalars(
-            select(PriceHistory).filter_by(product_id=product_id))
-        history = [{"product_id": res.product_id,
-                    "price": res.price,
-                    "date": res.timestamp} for res in result]
+        if bucket is None:
+            points = select(
+                series.c.price, series.c.timestamp,
+                func.lead(series.c.timestamp).over(
+                    order_by=series.c.timestamp).label("next")).subquery()
+            result = await session.execute(
+                select(Product.last_checked_at, points.c.price,
+                       points.c.timestamp,
+                       func.coalesce(points.c.next,
+                                     Product.last_checked_at).label("until"))
+                .outerjoin(points, true())
+                .where(Product.id == product_id)
+                .order_by(points.c.timestamp.desc())
+                .limit(limit + 1))
+            rows = result.all()
+            history = [{"product_id": product_id,
+                        "price": res.price,
+                        "date": res.timestamp,
+                        "until": res.until}
+                       for res in rows if res.timestamp is not None]
+            truncated = len(history) > limit
+            history = history[:limit][::-1]
+        elif HISTORY_RECORD_MODE == "changes":
+            result = await session.execute(
+                select(Product.last_checked_at, series)
+                .outerjoin(series, true())
+                .where(Product.id == product_id)
+                .order_by(series.c.timestamp))
+            rows = result.all()
+            until = rows[0].last_checked_at if rows else None
+            if date_to is not None and (until is None or until > date_to):
+                until = date_to
+            history = _aggregate_changes(
+                product_id, [res for res in rows if res.timestamp is not None],
+                bucket, until, limit)
+        else:
+            # Интервал подставляется литералом (значение проверено выше),
+            # чтобы выражение в SELECT и GROUP BY совпадало для PostgreSQL.
+            period = func.date_trunc(literal_column(f"'{bucket}'"),
+                                     series.c.timestamp)
+            last = array_agg(aggregate_order_by(
+                series.c.price, series.c.timestamp.desc()))[1]
+            buckets = (
+                select(period.label("date"),
+                       func.min(series.c.min_price).label("min"),
+                       func.max(series.c.max_price).label("max"),
+                       (func.sum(series.c.sum_price)
+                        / func.sum(series.c.samples)).label("avg"),
+                       last.label("last"))
+                .group_by(period)
+                .order_by(period)
+                .limit(limit)).subquery()
+            result = await session.execute(
+                select(Product.last_checked_at, buckets)
+                .outerjoin(buckets, true())
+                .where(Product.id == product_id)
+                .order_by(buckets.c.date))
+            rows = result.all()
+            history = [{"product_id": product_id,
+                        "date": res.date,
+                        "min": res.min,
+                        "max": res.max,
+                        "avg": round(float(res.avg), 2),
+                        "last": res.last}
+                       for res in rows if res.date is not None]
 
-        return {"message": history, "status_code": 200}
+        if not rows:
+            return {"message": "Товар не найден в базе данных.",
+                    "status_code": 404}
+        return {"message": history, "truncated": truncated,
+                "status_code": 200}
     except Exception as ex:
-        return {"message": f"Ошибка получения истории цен товара: {ex}",
+        logger.exception("Ошибка получения истории цен товара %s: %s",
+                         product_id, ex)
+        return {"message": "Ошибка получения истории цен товара.",
                 "status_code": 422}
 
 
+@observe_db
 async def select_all_item(
-        session: AsyncSession = Depends(get_session)) -> dict:
+        after_id: int = 0,
+        limit: int = 100,
+        fields: list | None = None,
+        session: AsyncSession = Depends(get_read_session)) -> dict:
     """
     Функция получения товаров на мониторинге.
 
     Args:
 
+        after_id: id последнего товара предыдущей страницы (курсор).
+        limit: Количество товаров на странице.
+        fields: Список возвращаемых полей (из PRODUCT_FIELDS),
+            по умолчанию все. Поле id возвращается всегда.
         session: Асинхронная сессия для базы данных.
     
     Returns:
 
-        Возвращает список(словарь) товаров, находящихся на мониторинге
+        Возвращает список(словарь) товаров, находящихся на мониторинге,
+        и курсор следующей страницы (None, если страница последняя).
+
+    Notes:
+
+        Выбираются только запрошенные столбцы, а страница ищется
+        по первичному ключу (WHERE id > after_id ORDER BY id LIMIT n),
+        поэтому стоимость запроса зависит от размера страницы,
+        а не от размера таблицы.
     """
+    fields = ["id"] + [field for field in (fields or PRODUCT_FIELDS)
+                       if field != "id"]
     try:
-        result = await session.scalars(select(Product))
-        products = [{"id": res.id, "name": res.name,
-                    "description": res.description,
-                    "rating": round(res.rating, 1)} for res in result]
-        return {"message": products, "status_code": 200}
+        result = await session.execute(
+            select(*(getattr(Product, field) for field in fields))
+            .where(Product.id > after_id)
+            .order_by(Product.id)
+            .limit(limit + 1))
+        rows = result.all()
+        products = []
+        for row in rows[:limit]:
+            product = dict(row._mapping)
+            if product.get("rating") is not None:
+                product["rating"] = round(product["rating"], 1)
+            products.append(product)
+        next_cursor = products[-1]["id"] if len(rows) > limit else None
+        return {"message": products, "next_cursor": next_cursor,
+                "status_code": 200}
     except Exception as ex:
         return {"message": f"Ошибка получения товаров на мониторинге: {ex}",
                 "status_code": 422}
 
+
+async def stream_history(
+        product_ids: list | None = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[list]:
+    """
+    Функция потокового чтения истории цен.
+
+    Args:
+
+        product_ids: Список id товаров, None - история всех товаров.
+        chunk_size: Количество строк в одном пакете.
+
+    Returns:
+
+        Асинхронно отдаёт пакеты строк (product_id, price, timestamp,
+        aggregated), упорядоченных по товару и времени.
+
+    Notes:
+
+        Дни, свёрнутые политикой хранения в price_history_daily,
+        выгружаются одной строкой на день: price - последняя цена дня,
+        timestamp - начало дня, aggregated - True.
+
+        Открывает собственную сессию чтения (реплика при заданном
+        DB_REPLICA_HOST; ответ отдаётся потоком уже после выхода
+        из зависимостей маршрута) и читает строки серверным
+        курсором, поэтому в памяти одновременно находится не больше
+        одного пакета.
+    """
+    raw = select(PriceHistory.product_id.label("product_id"),
+                 PriceHistory.price.label("price"),
+                 PriceHistory.timestamp.label("timestamp"),
+                 false().label("aggregated"))
+    daily = select(PriceHistoryDaily.product_id,
+                   PriceHistoryDaily.last,
+                   cast(PriceHistoryDaily.day, DateTime),
+                   true())
+    if product_ids:
+        raw = raw.where(PriceHistory.product_id.in_(product_ids))
+        daily = daily.where(PriceHistoryDaily.product_id.in_(product_ids))
+    history = union_all(raw, daily).subquery()
+    statement = (select(history)
+                 .order_by(history.c.product_id, history.c.timestamp)
+                 .execution_options(yield_per=chunk_size))
+    async with ReadSessionLocal() as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions(chunk_size):
+            yield rows
+
+
+@observe_db
+async def select_list_version(
+        session: AsyncSession = Depends(get_read_session)) -> dict:
+    """
+    Функция получения версии таблицы товаров.
+
+    Args:
+
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Возвращает версию и время последнего изменения списка товаров
+        (добавление или удаление), не читая саму таблицу товаров.
+    """
+    result = await session.execute(
+        select(TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.name == "products"))
+    row = result.first()
+    if row is None:
+        return {"version": 0, "updated_at": None}
+    return {"version": row.version, "updated_at": row.updated_at}
+
+
+@observe_db
+async def select_history_version(
+        product_id: int,
+        session: AsyncSession = Depends(get_read_session)) -> dict | None:
+    """
+    Функция получения времени последнего изменения истории цен товара.
+
+    Args:
+
+        product_id: id товара
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Возвращает время последней проверки цены товара или самой новой
+        записи истории (по индексу, без чтения истории),
+        None - если товара нет в базе данных.
+    """
+    newest = (select(PriceHistory.timestamp)
+              .where(PriceHistory.product_id == product_id)
+              .order_by(PriceHistory.timestamp.desc())
+              .limit(1).scalar_subquery())
+    result = await session.execute(
+        select(func.coalesce(Product.last_checked_at, newest))
+        .where(Product.id == product_id))
+    row = result.first()
+    if row is None:
+        return None
+    return {"updated_at": row[0]}
+
+
+@observe_db
+async def claim_products(
+        worker: str, limit: int, lease: int,
+        session: AsyncSession = Depends(get_session)) -> list:
+    """
+    Функция аренды пакета товаров для мониторинга.
+
+    Args:
+
+        worker: Идентификатор обработчика мониторинга.
+        limit: Максимальное количество товаров в пакете.
+        lease: Срок аренды в секундах.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Возвращает список (id товара, URL от API с ценой товара,
+        последняя записанная цена) для товаров, срок проверки которых
+        наступил, начиная с самых просроченных.
+
+    Notes:
+
+        Строки выбираются по индексу next_poll_at с FOR UPDATE SKIP LOCKED,
+        поэтому одновременные обработчики получают непересекающиеся пакеты,
+        не ожидая друг друга. На время аренды срок проверки переносится
+        на её окончание: товары с ошибкой или упавшего обработчика снова
+        становятся доступны, когда аренда истечёт, а record_prices
+        назначает следующий срок проверки. Время считается по часам
+        базы данных.
+    """
+    due = (select(Product.id)
+           .where(Product.next_poll_at <= func.now())
+           .order_by(Product.next_poll_at)
+           .limit(limit)
+           .with_for_update(skip_locked=True))
+    result = await session.execute(
+        update(Product)
+        .where(Product.id.in_(due.scalar_subquery()))
+        .values(lease_owner=worker,
+                next_poll_at=func.now() + timedelta(seconds=lease))
+        .returning(Product.id, Product.url_price, Product.last_price)
+        .execution_options(synchronize_session=False))
+    products = [(row.id, row.url_price, row.last_price) for row in result]
+    await session.commit()
+    return products
+
+
+@observe_db
+async def release_leases(
+        worker: str, session: AsyncSession = Depends(get_session)) -> int:
+    """
+    Функция снятия аренды с товаров обработчика.
+
+    Args:
+
+        worker: Идентификатор обработчика мониторинга.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Снимает аренду и делает товары сразу доступными для проверки
+        другим обработчикам, возвращает количество освобождённых товаров.
+    """
+    result = await session.execute(
+        update(Product)
+        .where(Product.lease_owner == worker)
+        .values(lease_owner=None, next_poll_at=func.now())
+        .execution_options(synchronize_session=False))
+    await session.commit()
+    return result.rowcount
+
+
+@observe_db
+async def set_poll_interval(
+        product_id: int, poll_interval: int | None,
+        session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция изменения интервала мониторинга товара.
+
+    Args:
+
+        product_id: id товара.
+        poll_interval: Интервал мониторинга в секундах
+            (None - MONITORING_INTERVAL).
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Задаёт товару интервал мониторинга и, если новый интервал
+        короче, переносит ближайшую проверку на случайный момент
+        в его пределах, возвращает сообщение об успехе или ошибке
+        и статус код.
+    """
+    interval = poll_interval or MONITORING_INTERVAL
+    try:
+        result = await session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(poll_interval=poll_interval,
+                    next_poll_at=func.least(
+                        Product.next_poll_at,
+                        func.now() + timedelta(
+                            seconds=random.uniform(0, interval))))
+            .returning(Product.id)
+            .execution_options(synchronize_session=False))
+        if result.first() is None:
+            await session.rollback()
+            return {"message": "Товар не найден в базе данных.",
+                    "status_code": 404}
+        await session.commit()
+        return {"message": f"Интервал мониторинга товара {product_id}: "
+                           f"{interval} сек.",
+                "status_code": 200}
+    except Exception as ex:
+        await session.rollback()
+        return {"message": f"Проблемы с изменением интервала: {ex}",
+                "status_code": 422}
+
+
+@observe_db
+async def add_subscription(
+        product_id: int, contact: str, threshold: float | None,
+        drop_percent: float | None,
+        session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция добавления подписки на снижение цены.
+
+    Args:
+
+        product_id: id товара.
+        contact: Куда отправлять оповещение.
+        threshold: Порог цены (или None).
+        drop_percent: Процент снижения цены (или None).
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Добавляет подписку и увеличивает версию подписок (по ней
+        обработчики мониторинга перечитывают индекс подписок),
+        возвращает id подписки и статус код, иначе сообщение
+        об ошибке и статус код (404, если товара нет).
+    """
+    try:
+        result = await session.execute(
+            insert(Subscription)
+            .from_select(
+                ["product_id", "contact", "threshold", "drop_percent"],
+                select(Product.id, cast(literal(contact), String),
+                       cast(literal(threshold), Float),
+                       cast(literal(drop_percent), Float))
+                .where(Product.id == product_id))
+            .returning(Subscription.id))
+        subscription_id = result.scalar()
+        if subscription_id is None:
+            await session.rollback()
+            return {"message": "Товар не найден в базе данных.",
+                    "status_code": 404}
+        await _bump_version("subscriptions", session)
+        await session.commit()
+        return {"message": subscription_id, "status_code": 200}
+    except Exception as ex:
+        await session.rollback()
+        return {"message": f"Проблемы с добавлением подписки: {ex}",
+                "status_code": 422}
+
+
+@observe_db
+async def delete_subscription(
+        subscription_id: int,
+        session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция удаления подписки.
+
+    Args:
+
+        subscription_id: id подписки.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Удаляет подписку, возвращает сообщение об успехе или ошибке
+        и статус код (404, если подписки нет).
+    """
+    try:
+        result = await session.execute(
+            delete(Subscription)
+            .where(Subscription.id == subscription_id)
+            .returning(Subscription.id))
+        if result.scalar() is None:
+            await session.rollback()
+            return {"message": "Подписка не найдена в базе данных.",
+                    "status_code": 404}
+        await _bump_version("subscriptions", session)
+        await session.commit()
+        return {"message": f"Подписка с id: {subscription_id} удалена!",
+                "status_code": 200}
+    except Exception as ex:
+        await session.rollback()
+        return {"message": f"Проблемы с удалением подписки: {ex}",
+                "status_code": 422}
+
+
+@observe_db
+async def select_subscriptions(
+        session: AsyncSession = Depends(get_session)) -> list:
+    """
+    Функция получения всех подписок.
+
+    Args:
+
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Возвращает список (id подписки, id товара, контакт, порог,
+        процент снижения), выбирая только эти столбцы.
+    """
+    result = await session.execute(
+        select(Subscription.id, Subscription.product_id,
+               Subscription.contact, Subscription.threshold,
+               Subscription.drop_percent))
+    return [tuple(row) for row in result]
+
+
+@observe_db
+async def select_table_version(
+        name: str, session: AsyncSession = Depends(get_session)) -> int:
+    """
+    Функция получения версии таблицы.
+
+    Args:
+
+        name: Название таблицы в table_versions.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        Возвращает номер версии таблицы (0 - таблица не менялась).
+    """
+    result = await session.execute(
+        select(TableVersion.version).where(TableVersion.name == name))
+    return result.scalar() or 0
+
+
+@observe_db
+async def record_prices(prices: list, worker: str | None = None,
+                        mode: str = HISTORY_RECORD_MODE,
+                        session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция записи полученных цен товаров.
+
+    Args:
+
+        prices: Список словарей вида {"product_id": id, "price": цена,
+            "last_price": последняя записанная цена}.
+        worker: Идентификатор обработчика, арендовавшего товары
+            (None - без проверки аренды).
+        mode: Режим записи: "all" - каждая цена, "changes" - только цены,
+            отличающиеся от последней записанной.
+        session: Асинхронная сессия для базы данных.
+
+    Returns:
+
+        В одной транзакции добавляет строки истории, обновляет
+        products.last_price у изменившихся товаров, products.last_checked_at
+        у всех проверенных, снимает с них аренду и назначает следующий
+        срок проверки (интервал товара с разбросом), возвращает число
+        записанных строк истории, id записанных товаров (recorded)
+        и статус код, иначе сообщение об ошибке и статус код.
+
+    Notes:
+
+        Цены записываются только для товаров, аренда которых не истекла
+        и не перешла к другому обработчику (lease_owner = worker
+        и next_poll_at > now()), остальные отбрасываются: их уже
+        проверяет другой обработчик. Строки товаров блокируются первым
+        же UPDATE, поэтому claim_products не заберёт их до конца
+        транзакции. Последняя цена приходит вместе с товаром из claim_products,
+        поэтому сравнение не требует дополнительного SELECT. Период без
+        изменений цены - от строки истории до следующей строки
+        (или до products.last_checked_at).
+    """
+    if not prices:
+        return {"message": 0, "recorded": [], "status_code": 200}
+    checked_at = datetime.now()
+    conditions = [Product.id.in_([item["product_id"] for item in prices])]
+    if worker is not None:
+        conditions += [Product.lease_owner == worker,
+                       Product.next_poll_at > func.now()]
+    try:
+        result = await session.execute(
+            update(Product)
+            .where(*conditions)
+            .values(last_checked_at=checked_at, lease_owner=None,
+                    next_poll_at=literal_column(NEXT_POLL_SQL))
+            .returning(Product.id)
+            .execution_options(synchronize_session=False))
+        recorded = set(result.scalars())
+        changed = [{"product_id": item["product_id"], "price": item["price"]}
+                   for item in prices
+                   if item["product_id"] in recorded and (
+                       mode == "all"
+                       or item["price"] != item.get("last_price"))]
+        if changed:
+            await session.execute(insert(PriceHistory), [
+                {**item, "timestamp": checked_at} for item in changed])
+            await session.execute(update(Product), [
+                {"id": item["product_id"], "last_price": item["price"]}
+                for item in changed])
+        await session.commit()
+        await response_cache.invalidate(
+            *(product_scope(product_id) for product_id in recorded))
+        return {"message": len(changed), "recorded": list(recorded),
+                "status_code": 200}
+    except Exception as ex:
+        await session.rollback()
+        return {"message": f"Проблемы с записью цен: {ex}",
+                "status_code": 422}
@@ -0,0 +1,243 @@
+"""
+Модуль секционирования и хранения истории цен.
+
+При HISTORY_PARTITIONING=1 таблица price_history становится
+секционированной по месяцам (RANGE по timestamp). Сырые записи старше
+HISTORY_RAW_RETENTION_DAYS дней сворачиваются в дневные агрегаты
+(price_history_daily), после чего целая месячная секция отсоединяется
+и удаляется за O(1), без построчного DELETE. При нескольких обработчиках
+мониторинга обслуживание выполняет один из них (advisory lock).
+
+Func:
+
+    partition_tables: Переводит существующую price_history
+        в секционированную таблицу (однократно, без копирования данных).
+
+    ensure_partitions: Создаёт месячные секции на текущий
+        и следующие месяцы.
+
+    apply_retention: Сворачивает старые сырые записи в дневные агрегаты
+        и удаляет их (секциями, либо одним DELETE без секционирования).
+
+    run_maintenance: Выполняет ensure_partitions и apply_retention
+        согласно настройкам.
+"""
+import logging
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from database.FDataBase import engine
+from config import (HISTORY_PARTITIONING, HISTORY_PARTITIONS_AHEAD,
+                    HISTORY_RAW_RETENTION_DAYS)
+
+
+logger = logging.getLogger(__name__)
+
+# Свёртка сырых записей в дневные агрегаты, {source} - таблица или секция
+ROLLUP_SQL = """
+INSERT INTO price_history_daily
+    (product_id, day, min, max, avg, last, samples)
+SELECT product_id,
+       date_trunc('day', timestamp)::date,
+       min(price), max(price), avg(price),
+       (array_agg(price ORDER BY timestamp DESC))[1],
+       count(*)
+FROM {source}
+WHERE timestamp < :cutoff
+GROUP BY product_id, date_trunc('day', timestamp)::date
+ON CONFLICT (product_id, day) DO UPDATE SET
+    min = LEAST(price_history_daily.min, EXCLUDED.min),
+    max = GREATEST(price_history_daily.max, EXCLUDED.max),
+    avg = (price_history_daily.avg * price_history_daily.samples
+           + EXCLUDED.avg * EXCLUDED.samples)
+          / (price_history_daily.samples + EXCLUDED.samples),
+    last = EXCLUDED.last,
+    samples = price_history_daily.samples + EXCLUDED.samples
+"""
+
+PARTITIONS_SQL = """
+SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'price_history'::regclass
+"""
+
+BOUND_TO = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+# Ключ advisory lock обслуживания истории цен
+MAINTENANCE_LOCK = 7_301_001
+
+
+def _next_month(day: date) -> date:
+    """Возвращает первый день следующего месяца."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+async def _is_partitioned(conn) -> bool:
+    """Проверяет, секционирована ли price_history."""
+    # relkind имеет тип "char", asyncpg возвращает его как bytes
+    result = await conn.execute(text(
+        "SELECT relkind::text FROM pg_class "
+        "WHERE oid = 'price_history'::regclass"))
+    return result.scalar() == "p"
+
+
+async def _try_lock(conn) -> bool:
+    """Берёт advisory lock обслуживания до конца транзакции."""
+    result = await conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"),
+                                {"key": MAINTENANCE_LOCK})
+    return bool(result.scalar())
+
+
+async def _partitions(conn) -> list:
+    """Возвращает список секций (имя, верхняя граница) по возрастанию."""
+    result = await conn.execute(text(PARTITIONS_SQL))
+    partitions = []
+    for row in result:
+        match = BOUND_TO.search(row.bound)
+        if match:
+            partitions.append(
+                (row.name, date.fromisoformat(match.group(1))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def partition_tables() -> None:
+    """
+    Функция перевода истории цен в секционированную таблицу.
+
+    Notes:
+
+        Существующая таблица переименовывается в price_history_legacy
+        и присоединяется секцией (MINVALUE .. начало следующего месяца),
+        поэтому данные не копируются. Первичный ключ секции заменяется
+        на (id, timestamp), как у новой таблицы, а ограничение CHECK
+        на верхнюю границу позволяет ATTACH PARTITION не проверять
+        строки повторно (после присоединения оно удаляется).
+        Повторный вызов ничего не делает.
+    """
+    async with engine.begin() as conn:
+        if await _is_partitioned(conn):
+            return
+        upper = (await conn.execute(text(
+            "SELECT GREATEST(date_trunc('month', now()),"
+            " date_trunc('month', max(timestamp)))"
+            " + interval '1 month' FROM price_history"))).scalar()
+        for statement in (
+                "ALTER TABLE price_history RENAME TO price_history_legacy",
+                "ALTER TABLE price_history_legacy RENAME CONSTRAINT "
+                "price_history_pkey TO price_history_legacy_pkey",
+                "ALTER INDEX ix_price_history_product_id_timestamp "
+                "RENAME TO ix_price_history_legacy_product_id_timestamp",
+                "UPDATE price_history_legacy SET timestamp = now() "
+                "WHERE timestamp IS NULL",
+                "ALTER TABLE price_history_legacy "
+                "ALTER COLUMN timestamp SET NOT NULL, "
+                "DROP CONSTRAINT price_history_legacy_pkey, "
+                "ADD PRIMARY KEY (id, timestamp), "
+                "ADD CONSTRAINT price_history_legacy_bound "
+                f"CHECK (timestamp < '{upper:%Y-%m-%d}')",
+                "CREATE TABLE price_history ("
+                " id integer NOT NULL"
+                " DEFAULT nextval('price_history_id_seq'),"
+                " product_id integer NOT NULL"
+                " REFERENCES products (id) ON DELETE CASCADE,"
+                " price double precision NOT NULL,"
+                " timestamp timestamp without time zone NOT NULL"
+                " DEFAULT now(),"
+                " PRIMARY KEY (id, timestamp)"
+                ") PARTITION BY RANGE (timestamp)",
+                "CREATE INDEX ix_price_history_product_id_timestamp "
+                "ON price_history (product_id, timestamp)",
+                "ALTER SEQUENCE price_history_id_seq "
+                "OWNED BY price_history.id",
+                "ALTER TABLE price_history ATTACH PARTITION "
+                "price_history_legacy FOR VALUES FROM (MINVALUE) "
+                f"TO ('{upper:%Y-%m-%d}')",
+                "ALTER TABLE price_history_legacy "
+                "DROP CONSTRAINT price_history_legacy_bound"):
+            await conn.execute(text(statement))
+    logger.info("Таблица price_history секционирована по месяцам.")
+
+
+async def ensure_partitions(ahead: int = HISTORY_PARTITIONS_AHEAD) -> None:
+    """
+    Функция создания месячных секций истории цен.
+
+    Args:
+
+        ahead: На сколько месяцев вперёд создавать секции.
+    """
+    async with engine.begin() as conn:
+        if not await _is_partitioned(conn) or not await _try_lock(conn):
+            return
+        partitions = await _partitions(conn)
+        start = partitions[-1][1] if partitions else \
+            datetime.now().date().replace(day=1)
+        last = datetime.now().date().replace(day=1)
+        for _ in range(ahead):
+            last = _next_month(last)
+        while start <= last:
+            end = _next_month(start)
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS price_history_p{start:%Y_%m} "
+                "PARTITION OF price_history "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"))
+            start = end
+
+
+async def apply_retention(
+        days: int = HISTORY_RAW_RETENTION_DAYS) -> int:
+    """
+    Функция применения политики хранения сырой истории цен.
+
+    Args:
+
+        days: Срок хранения сырых записей в днях.
+
+    Returns:
+
+        Возвращает количество свёрнутых секций (или 1/0 для
+        несекционированной таблицы), 0 - если обслуживание уже
+        выполняет другой обработчик.
+
+    Notes:
+
+        Граница округляется до начала дня, чтобы день не делился
+        между сырыми записями и агрегатами. В секционированной таблице
+        удаляются только секции целиком старше границы.
+    """
+    cutoff = datetime.combine(datetime.now().date() - timedelta(days=days),
+                              datetime.min.time())
+    async with engine.begin() as conn:
+        if not await _try_lock(conn):
+            return 0
+        if not await _is_partitioned(conn):
+            await conn.execute(text(ROLLUP_SQL.format(source="price_history")),
+                               {"cutoff": cutoff})
+            result = await conn.execute(
+                text("DELETE FROM price_history WHERE timestamp < :cutoff"),
+                {"cutoff": cutoff})
+            return int(result.rowcount > 0)
+
+        dropped = 0
+        for name, upper in await _partitions(conn):
+            if upper > cutoff.date():
+                break
+            await conn.execute(text(ROLLUP_SQL.format(source=name)),
+                               {"cutoff": cutoff})
+            await conn.execute(text(
+                f"ALTER TABLE price_history DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped += 1
+        return dropped
+
+
+async def run_maintenance() -> None:
+    """Функция обслуживания истории цен согласно настройкам."""
+    if HISTORY_PARTITIONING:
+        await ensure_partitions()
+    if HISTORY_RAW_RETENTION_DAYS > 0:
+        resault = await apply_retention()
+        if resault:
+            logger.info("Свёрнуто в дневные агрегаты: %s", resault)
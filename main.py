@@ -1,23 +1,139 @@
 """
 Исполняющий модуль программы.
 
+Запуск (воркеры, порт и т.д. - в config.py):
+
+    python main.py
+
+Схема базы данных проверяется и при необходимости создаётся в lifespan
+каждого воркера, поэтому отдельный шаг перед uvicorn не нужен.
+
+Classes:
+
+    FirstRequestTimer: ASGI middleware, записывает время от запуска
+        процесса до первого запроса.
+
 Func:
 
-    main: Создаёт таблицы в базе данных.
+    lifespan: Проверяет схему базы данных, открывает общую HTTP сессию
+        и заранее соединения с базой, запускает модуль мониторинга
+        цен вместе с приложением (если MONITORING_ENABLED=1),
+        при завершении останавливает мониторинг и закрывает сессию
+        и соединения.
+
+    main: Создаёт таблицы в базе данных, применяет миграции схемы
+        и при необходимости секционирует историю цен.
+
+Время обработки каждого запроса записывает MetricsMiddleware,
+метрики доступны по маршруту /metrics.
 """
+import os
+import time
+
+
+def _process_age() -> float:
+    """
+    Возвращает, сколько секунд назад запущен процесс (по /proc), чтобы
+    время запуска включало старт интерпретатора и импорт зависимостей.
+    Без /proc (не Linux) возвращает 0 - отсчёт от импорта модуля.
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # Поля после имени процесса, starttime - 22-е поле stat
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+# Время запуска процесса (по часам time.monotonic)
+STARTED = time.monotonic() - _process_age()
+
 import asyncio
-import uvicorn
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from database.FDataBase import create_tables, delete_tables
-from routers.router import app_parsing
-from config import SECRET_KEY
+from database.FDataBase import (create_tables, migrate_tables, engine,
+                                replica_engine, schema_is_current,
+                                schema_lock, warm_up)
+from routers.router import app_parsing, app_metrics
+from metrics.metrics import MetricsMiddleware, observe_startup
+from backend.client import start_client, close_client
+from config import (SECRET_KEY, MONITORING_ENABLED, HISTORY_PARTITIONING,
+                    SCHEMA_SETUP, DB_WARMUP_CONNECTIONS, APP_HOST, APP_PORT,
+                    APP_WORKERS, APP_RELOAD)
+
+
+logger = logging.getLogger("uvicorn.error")
 
 
-app = FastAPI()
+class FirstRequestTimer:
+    """
+    ASGI middleware замера времени до первого запроса.
+
+    Args:
+
+        app: ASGI приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.done = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.done and scope["type"] == "http":
+            self.done = True
+            seconds = time.monotonic() - STARTED
+            observe_startup("first_request", seconds)
+            logger.info("Первый запрос через %.3f с после запуска.", seconds)
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл приложения.
+
+    Notes:
+
+        При SCHEMA_SETUP=1 проверяет схему базы данных (и создаёт или
+        мигрирует её только при необходимости). Одновременно создаёт общую
+        HTTP сессию для запросов к магазину и открывает
+        DB_WARMUP_CONNECTIONS соединений с базой, чтобы первые запросы
+        не ждали соединения. При MONITORING_ENABLED=1 запускает фоновую
+        задачу мониторинга цен и отменяет её при остановке приложения.
+    """
+    if SCHEMA_SETUP:
+        await main()
+    await asyncio.gather(start_client(), warm_up(DB_WARMUP_CONNECTIONS))
+    task = None
+    if MONITORING_ENABLED:
+        from monitoring.monitoring import run_monitoring
+        task = asyncio.create_task(run_monitoring())
+    ready = time.monotonic() - STARTED
+    observe_startup("ready", ready)
+    logger.info("Приложение готово через %.3f с после запуска.", ready)
+    yield
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await close_client()
+    for target in {engine, replica_engine}:
+        await target.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(app_parsing)
+app.include_router(app_metrics)
 app.add_middleware(SessionMiddleware,
                    secret_key=SECRET_KEY,
                    max_age=360)
@@ -28,6 +144,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(FirstRequestTimer)
 
 
 async def main() -> None:
@@ -36,10 +154,31 @@ async def main() -> None:
 
     func:
         create_tables: создаёт таблицы в базе.
+        migrate_tables: применяет изменения схемы к существующим таблицам.
+        partition_tables: секционирует историю цен (HISTORY_PARTITIONING=1).
+
+    Notes:
+
+        Если все миграции уже применены, стоит один запрос. Иначе схема
+        меняется под блокировкой: из одновременно стартующих воркеров
+        её меняет первый, остальные дожидаются и ничего не делают.
     """
-    await create_tables()
+    if not HISTORY_PARTITIONING and await schema_is_current():
+        return
+    async with schema_lock():
+        if not await schema_is_current():
+            await create_tables()
+            await migrate_tables()
+        if HISTORY_PARTITIONING:
+            from database.partitioning import (partition_tables,
+                                               ensure_partitions)
+            await partition_tables()
+            await ensure_partitions()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run("main:app", host=APP_HOST, port=APP_PORT,
+                workers=None if APP_RELOAD else APP_WORKERS,
+                reload=APP_RELOAD)
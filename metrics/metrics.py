@@ -0,0 +1,298 @@
+"""
+Модуль метрик производительности (формат Prometheus).
+
+Время замеряется лёгкими хуками: ASGI middleware для маршрутов,
+trace-хуки aiohttp для запросов к магазину, события SQLAlchemy для
+запросов к базе. Метрики отдаёт маршрут /metrics. Требуется пакет
+prometheus_client; без него (или при METRICS_ENABLED=0) метрики
+не собираются, а хуки не устанавливаются. При нескольких воркерах
+uvicorn метрики собираются со всех процессов, если задан каталог
+PROMETHEUS_MULTIPROC_DIR (режим multiprocess prometheus_client).
+
+Classes:
+
+    MetricsMiddleware: ASGI middleware, замеряет время обработки
+        запросов по шаблону маршрута, методу и статусу ответа.
+
+Func:
+
+    observe_db: Декоратор функций базы данных, замеряет время
+        выполнения операции по имени функции.
+
+    pool_class: Возвращает класс пула соединений SQLAlchemy, который
+        записывает время ожидания соединения из пула.
+
+    observe_cycle: Записывает длительность и результаты прохода
+        мониторинга цен.
+
+    observe_startup: Записывает время запуска приложения по этапам.
+
+    instrument_engine: Устанавливает на движок SQLAlchemy хуки замера
+        времени SQL запросов.
+
+    trace_config: Возвращает trace-хуки aiohttp для замера запросов
+        к магазину по хосту и статусу (или None).
+
+    render: Возвращает метрики в текстовом формате Prometheus.
+"""
+import functools
+import os
+import time
+
+from config import METRICS_ENABLED
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+ENABLED = METRICS_ENABLED and prometheus_client is not None
+
+# Границы корзин (секунды) для быстрых операций и для проходов мониторинга
+FAST_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+CYCLE_BUCKETS = (.1, .5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+if ENABLED:
+    HTTP_LATENCY = prometheus_client.Histogram(
+        "http_request_duration_seconds",
+        "Время обработки запроса к приложению.",
+        ("method", "route", "status"))
+    UPSTREAM_LATENCY = prometheus_client.Histogram(
+        "upstream_request_duration_seconds",
+        "Время запроса к API магазина.",
+        ("host", "status"))
+    DB_OPERATION_LATENCY = prometheus_client.Histogram(
+        "db_operation_duration_seconds",
+        "Время операции с базой данных (функции FDataBase).",
+        ("operation",), buckets=FAST_BUCKETS)
+    DB_STATEMENT_LATENCY = prometheus_client.Histogram(
+        "db_statement_duration_seconds",
+        "Время выполнения SQL запроса по типу запроса.",
+        ("statement",), buckets=FAST_BUCKETS)
+    DB_POOL_WAIT = prometheus_client.Histogram(
+        "db_pool_checkout_seconds",
+        "Время ожидания соединения из пула (primary или replica).",
+        ("pool",), buckets=FAST_BUCKETS)
+    CYCLE_LATENCY = prometheus_client.Histogram(
+        "monitoring_cycle_duration_seconds",
+        "Длительность прохода мониторинга цен.",
+        buckets=CYCLE_BUCKETS)
+    STARTUP = prometheus_client.Gauge(
+        "app_startup_seconds",
+        "Время от запуска процесса до готовности и до первого запроса.",
+        ("stage",), multiprocess_mode="max")
+    CYCLE_PRODUCTS = prometheus_client.Counter(
+        "monitoring_products",
+        "Товары, обработанные проходами мониторинга, по результату.",
+        ("result",))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware замера времени обработки запросов.
+
+    Args:
+
+        app: ASGI приложение.
+
+    Notes:
+
+        Метка route - шаблон пути (/parsing/history_price/{item_id}),
+        а не сам путь, чтобы число рядов метрики не росло с данными.
+        Для потоковых ответов время включает отправку всего тела.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)).observe(time.perf_counter() - started)
+
+
+def observe_db(func):
+    """
+    Декоратор замера времени операции с базой данных.
+
+    Args:
+
+        func: Асинхронная функция модуля FDataBase.
+    """
+    if not ENABLED:
+        return func
+    histogram = DB_OPERATION_LATENCY.labels(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return wrapper
+
+
+def pool_class(pool: str):
+    """
+    Функция получения класса пула соединений.
+
+    Args:
+
+        pool: Метка пула в метрике (primary или replica).
+
+    Returns:
+
+        Возвращает подкласс AsyncAdaptedQueuePool, замеряющий время
+        Pool.connect() - ожидание свободного соединения (и установку
+        нового), иначе сам AsyncAdaptedQueuePool, если метрики выключены.
+
+    Notes:
+
+        У пула нет события перед выдачей соединения (checkout вызывается
+        уже после), поэтому время замеряет сам пул. Соединение берётся,
+        когда сессия выполняет первый запрос, а не при её открытии.
+    """
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    if not ENABLED:
+        return AsyncAdaptedQueuePool
+    histogram = DB_POOL_WAIT.labels(pool)
+
+    class TimedPool(AsyncAdaptedQueuePool):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+    return TimedPool
+
+
+def observe_cycle(stats: dict) -> None:
+    """
+    Функция записи результатов прохода мониторинга.
+
+    Args:
+
+        stats: Статистика прохода (monitoring.run_cycle).
+    """
+    if not ENABLED:
+        return
+    CYCLE_LATENCY.observe(stats["duration"])
+    for result in ("success", "failed", "changed"):
+        CYCLE_PRODUCTS.labels(result).inc(stats[result])
+
+
+def observe_startup(stage: str, seconds: float) -> None:
+    """Функция записи времени запуска приложения (ready, first_request)."""
+    if ENABLED:
+        STARTUP.labels(stage).set(seconds)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Функция установки хуков замера SQL запросов на движок.
+
+    Args:
+
+        engine: Асинхронный движок SQLAlchemy.
+    """
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters,
+                              context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters,
+                             context, executemany):
+        started = conn.info["query_started"].pop()
+        words = statement.split(None, 1)
+        verb = words[0].upper() if words else ""
+        DB_STATEMENT_LATENCY.labels(verb).observe(
+            time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+def trace_config():
+    """
+    Функция получения trace-хуков aiohttp.
+
+    Returns:
+
+        Возвращает aiohttp.TraceConfig, записывающий время каждого
+        запроса к магазину (включая повторы) по хосту и статусу,
+        иначе None, если метрики выключены.
+    """
+    if not ENABLED:
+        return None
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        status = str(params.response.status)
+        UPSTREAM_LATENCY.labels(params.url.host, status).observe(
+            time.perf_counter() - context.started)
+
+    async def on_request_exception(session, context, params):
+        UPSTREAM_LATENCY.labels(params.url.host, "error").observe(
+            time.perf_counter() - context.started)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    return config
+
+
+def render() -> tuple:
+    """
+    Функция выгрузки метрик.
+
+    Returns:
+
+        Возвращает (тело в текстовом формате Prometheus, Content-Type),
+        иначе (None, None), если метрики выключены.
+    """
+    if not ENABLED:
+        return None, None
+    registry = prometheus_client.REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return (prometheus_client.generate_latest(registry),
+            prometheus_client.CONTENT_TYPE_LATEST)
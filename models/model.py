@@ -6,11 +6,23 @@ Shemas:
     UrlCheck: 
         url_info: URL от API МВИДЕО c общей ифно о товаре.
         url_price: URL от API МВИДЕО c ифно о цене товара.
+        poll_interval: Интервал мониторинга товара (необязательно).
+
+    UrlCheckList:
+        items: Список пар URL (UrlCheck) для пакетного добавления товаров.
 
     ProductId: 
         product_id: id продукта.
+
+    SubscriptionCreate:
+        product_id: id продукта.
+        contact: Куда отправлять оповещение.
+        threshold: Порог цены (необязательно).
+        drop_percent: Процент снижения цены (необязательно).
 """
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+
+from config import MONITORING_MIN_INTERVAL
 
 
 class UrlCheck(BaseModel):
@@ -21,9 +33,24 @@ class UrlCheck(BaseModel):
 
         url_info: URL от API МВИДЕО c общей ифно о товаре.
         url_price: URL от API МВИДЕО c ифно о цене товара.
+        poll_interval: Интервал мониторинга товара в секундах
+            (None - MONITORING_INTERVAL).
     """
     url_info: HttpUrl
     url_price: HttpUrl
+    poll_interval: int | None = Field(None, ge=MONITORING_MIN_INTERVAL)
+
+
+
+class UrlCheckList(BaseModel):
+    """
+    Модель для валидации списка ссылок о товарах.
+
+    Args:
+
+        items: Список пар URL от API МВИДЕО (UrlCheck).
+    """
+    items: list[UrlCheck] = Field(min_length=1, max_length=10000)
 
 
 class ProductId(BaseModel):
@@ -34,4 +61,32 @@ class ProductId(BaseModel):
 
         product_id: id товара в базе данных.
     """
-    product_id: int
\ No newline at end of file
+    product_id: int
+
+
+class SubscriptionCreate(BaseModel):
+    """
+    Модель для валидации подписки на снижение цены.
+
+    Args:
+
+        product_id: id товара в базе данных.
+        contact: Куда отправлять оповещение (адрес, id чата и т.д.).
+        threshold: Оповестить, когда цена опустится до порога или ниже.
+        drop_percent: Оповестить, когда цена снизится на столько
+            процентов или больше за одну проверку.
+
+    Notes:
+
+        Должен быть задан порог, процент снижения или оба.
+    """
+    product_id: int
+    contact: str = Field(min_length=1, max_length=200)
+    threshold: float | None = Field(None, gt=0)
+    drop_percent: float | None = Field(None, gt=0, lt=100)
+
+    @model_validator(mode="after")
+    def check_condition(self):
+        if self.threshold is None and self.drop_percent is None:
+            raise ValueError("Нужно задать threshold и/или drop_percent.")
+        return self
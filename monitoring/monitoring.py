@@ -0,0 +1,241 @@
+"""
+Модуль мониторинга цен на товары.
+
+Может работать вместе с приложением FastAPI (main:app, при
+MONITORING_ENABLED=1) или как отдельный процесс:
+
+    python -m monitoring.monitoring
+
+Каждый товар проверяется в свой срок (products.next_poll_at): первый
+срок - случайный момент в пределах интервала, следующие - через интервал
+товара (products.poll_interval или MONITORING_INTERVAL) с разбросом
+MONITORING_JITTER. Поэтому нагрузка на магазин и запись истории
+распределена по интервалу равномерно, без пиков в начале часа.
+
+Обработчиков может быть несколько (процессы, контейнеры, узлы): товары
+делятся между ними арендой строк в PostgreSQL (FOR UPDATE SKIP LOCKED).
+Товары упавшего обработчика забирают остальные по истечении аренды.
+
+Func:
+
+    fetch_price: Получает на вход: id товара, URL от API с ценой,
+        последнюю записанную цену и семафор,
+        возвращает цену товара или сообщение об ошибке(dict).
+
+    run_cycle: Выполняет один проход мониторинга: пакетами арендует
+        товары, срок проверки которых наступил, конкурентно получает
+        их цены, записывает изменившиеся цены в историю и проверяет
+        по ним подписки на снижение цены, возвращает статистику
+        прохода(dict).
+
+    run_monitoring: Бесконечно запускает проходы мониторинга каждые
+        MONITORING_TICK секунд и обслуживание истории цен (секции,
+        политика хранения) раз в MONITORING_INTERVAL.
+
+    get_last_cycle: Возвращает статистику последнего прохода мониторинга.
+
+    main: Стартовая функция отдельного процесса мониторинга.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from backend.backend import get_html, get_price_item, fetch_scheduler
+from backend.client import close_client
+from alerts.alerts import alert_pipeline
+from database.FDataBase import (AsyncSessionLocal, claim_products,
+                                record_prices, release_leases)
+from database.partitioning import run_maintenance
+from metrics.metrics import observe_cycle
+from config import (MONITORING_INTERVAL, MONITORING_CONCURRENCY,
+                    MONITORING_BATCH_SIZE, MONITORING_WORKER_ID,
+                    MONITORING_LEASE_TTL, MONITORING_TICK)
+
+
+logger = logging.getLogger(__name__)
+
+# Идентификатор обработчика - владелец аренды товаров
+WORKER_ID = MONITORING_WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+# Статистика последнего прохода мониторинга
+last_cycle = {}
+
+
+async def fetch_price(product_id: int, url_price: str,
+                      last_price: float | None,
+                      semaphore: asyncio.Semaphore) -> dict:
+    """
+    Функция получения цены одного товара.
+
+    Args:
+
+        product_id: id товара.
+        url_price: Ссылка на API с информацией о цене товара.
+        last_price: Последняя записанная цена товара.
+        semaphore: Семафор, ограничивающий число одновременных запросов.
+
+    Returns:
+
+        Возвращает словарь с id товара и ценой,
+        иначе словарь с id товара и сообщением об ошибке.
+    """
+    async with semaphore:
+        try:
+            data_price = await get_html(url=url_price)
+        except Exception as ex:
+            return {"product_id": product_id, "error": str(ex)}
+    if "error" in data_price:
+        return {"product_id": product_id, "error": data_price["error"]}
+    data = await get_price_item(data_price=data_price["message"])
+    if data["status_code"] != 200:
+        return {"product_id": product_id, "error": data["error"]}
+    return {"product_id": product_id, "price": data["price"],
+            "last_price": last_price}
+
+
+async def _flush(batch: list, counters: dict, worker: str) -> None:
+    """
+    Записывает пакет цен в базу, проверяет по нему подписки
+    на снижение цены и обновляет счётчики прохода. Цены товаров,
+    аренда которых истекла до записи, отбрасываются.
+    """
+    async with AsyncSessionLocal() as session:
+        resault = await record_prices(prices=batch, worker=worker,
+                                      session=session)
+    if resault["status_code"] != 200:
+        logger.error(resault["message"])
+        return
+    recorded = set(resault["recorded"])
+    lost = len(batch) - len(recorded)
+    if lost:
+        counters["lost"] += lost
+        logger.warning("Аренда %s товаров истекла до записи цен, "
+                       "увеличьте MONITORING_LEASE_TTL.", lost)
+        batch = [item for item in batch if item["product_id"] in recorded]
+    counters["success"] += len(batch)
+    counters["changed"] += resault["message"]
+    try:
+        counters["alerts"] += await alert_pipeline.process(batch)
+    except Exception as ex:
+        logger.exception("Ошибка проверки подписок: %s", ex)
+
+
+async def run_cycle(concurrency: int = MONITORING_CONCURRENCY,
+                    batch_size: int = MONITORING_BATCH_SIZE,
+                    worker: str = WORKER_ID) -> dict:
+    """
+    Функция одного прохода мониторинга.
+
+    Args:
+
+        concurrency: Максимальное число одновременных запросов к магазину.
+        batch_size: Размер арендуемого пакета товаров и пакета цен
+            для одной записи в базу.
+        worker: Идентификатор обработчика.
+
+    Returns:
+
+        Возвращает статистику прохода: число товаров, успешно
+        полученных и записанных цен, ошибок, цен, отброшенных
+        из-за истёкшей аренды, записанных в историю
+        изменений цены, отправленных оповещений, длительность
+        в секундах, состояние планировщика запросов (ограничители
+        по хостам, условные и объединённые запросы) и счётчики
+        оповещений (проверено, отправлено, ошибок, отложено, подписок).
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    counters = {"total": 0, "success": 0, "lost": 0, "changed": 0,
+                "alerts": 0}
+    while True:
+        async with AsyncSessionLocal() as session:
+            products = await claim_products(
+                worker=worker, limit=batch_size,
+                lease=MONITORING_LEASE_TTL, session=session)
+        if not products:
+            break
+        counters["total"] += len(products)
+        resaults = await asyncio.gather(*(
+            fetch_price(product_id, url_price, last_price, semaphore)
+            for product_id, url_price, last_price in products))
+        await _flush([resault for resault in resaults
+                      if "error" not in resault], counters, worker)
+
+    stats = {"total": counters["total"],
+             "success": counters["success"],
+             "failed": counters["total"] - counters["success"]
+             - counters["lost"],
+             "lost": counters["lost"],
+             "changed": counters["changed"],
+             "alerts": counters["alerts"],
+             "duration": round(time.perf_counter() - started, 3),
+             "finished_at": time.time(),
+             "worker": worker,
+             "fetch": fetch_scheduler.stats(),
+             "alert_pipeline": alert_pipeline.stats()}
+    if stats["total"]:
+        last_cycle.clear()
+        last_cycle.update(stats)
+        observe_cycle(stats)
+        logger.debug("Проход мониторинга завершён: %s", stats)
+    return stats
+
+
+async def run_monitoring(tick: float = MONITORING_TICK,
+                         worker: str = WORKER_ID) -> None:
+    """
+    Функция непрерывного мониторинга цен.
+
+    Args:
+
+        tick: Пауза между проходами в секундах.
+        worker: Идентификатор обработчика.
+
+    Notes:
+
+        Проход забирает только товары, срок проверки которых наступил,
+        поэтому частые проходы дают ровную нагрузку. При остановке аренда
+        товаров обработчика снимается, чтобы их сразу забрали остальные.
+    """
+    maintained = None
+    try:
+        while True:
+            try:
+                await run_cycle(worker=worker)
+            except Exception as ex:
+                logger.exception("Ошибка прохода мониторинга: %s", ex)
+            if maintained is None or \
+                    time.monotonic() - maintained >= MONITORING_INTERVAL:
+                maintained = time.monotonic()
+                try:
+                    await run_maintenance()
+                except Exception as ex:
+                    logger.exception("Ошибка обслуживания истории цен: %s",
+                                     ex)
+            await asyncio.sleep(tick)
+    finally:
+        try:
+            async with AsyncSessionLocal() as session:
+                await release_leases(worker=worker, session=session)
+        except Exception as ex:
+            logger.exception("Ошибка снятия аренды товаров: %s", ex)
+
+
+def get_last_cycle() -> dict:
+    """Функция получения статистики последнего прохода мониторинга."""
+    return dict(last_cycle)
+
+
+async def main() -> None:
+    """Стартовая функция отдельного процесса мониторинга."""
+    try:
+        await run_monitoring()
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -8,29 +8,119 @@ Func:
         добавляет спарсенную информацию в базу данных,
         возвращает сообщение об успехе или об ошибке и статус код.
 
+    add_products: Маршрут пакетного добавления товаров. Получает на вход:
+        список валидированных пар URL и объект сессии, конкурентно парсит их,
+        добавляет все корректные товары одним запросом в базу данных,
+        возвращает результат по каждому товару и статус код.
+
     delete_product: Маршрут удаление товара. Получает на вход:
         id товара и объект сессии, удаляет товар,
         возвращает сообщение об успехе или об ошибке и статус код.
 
+    set_product_poll_interval: Маршрут изменения интервала мониторинга
+        товара. Получает на вход: id товара, интервал в секундах
+        (без интервала - общий MONITORING_INTERVAL) и объект сессии,
+        возвращает сообщение об успехе или об ошибке и статус код.
+
+    subscribe: Маршрут подписки на снижение цены товара. Получает на вход:
+        id товара, контакт, порог цены и/или процент снижения и объект
+        сессии, возвращает id подписки или ошибку и статус код.
+
+    unsubscribe: Маршрут удаления подписки. Получает на вход: id подписки
+        и объект сессии, возвращает сообщение об успехе или об ошибке
+        и статус код.
+
     get_list_monitoring: Маршрут получения товаров, находящихся на мониторинге.
-        Получает на вход: объект сессии, возвращает(dict) со списком товаров
-        и статус кодом, иначе ошибку и статус код.
+        Получает на вход: курсор, размер страницы, список полей и объект
+        сессии, возвращает(dict) со страницей товаров, курсором следующей
+        страницы и статус кодом, иначе ошибку и статус код.
 
     get_history_price_item: Маршрут получения истории цен, на заданый товар.
-        Получает на вход: id товара и объект сессии, возвращает всю историю цен
-        на товар, в том числе и время добавления цены, а так же и статус код.
+        Получает на вход: id товара, границы периода, лимит, интервал
+        агрегации и объект сессии, возвращает историю цен на товар,
+        в том числе и время добавления цены (или агрегаты по интервалам),
+        а так же и статус код.
+
+    export_history: Маршрут потоковой выгрузки истории цен одного,
+        нескольких или всех товаров в формате NDJSON или CSV.
+
+    get_monitoring_stats: Маршрут получения статистики последнего прохода
+        мониторинга цен: число товаров, успехов, ошибок и длительность.
+
+    get_cache_stats: Маршрут получения счётчиков попаданий и промахов
+        кэша ответов.
+
+    get_metrics: Маршрут выгрузки метрик производительности
+        в формате Prometheus (/metrics).
+
+Ответы get_list_monitoring и get_history_price_item кэшируются
+(cache.cache.response_cache) и инвалидируются при изменении товаров и цен.
+Они же отдают ETag/Last-Modified и отвечают 304 Not Modified на условные
+запросы (If-None-Match/If-Modified-Since), не читая данные из базы.
 """
-from fastapi import APIRouter, Depends
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal
 
-from database.FDataBase import (add_item_info, delete_item,
-                                select_history_price, select_item,
-                                get_session, select_all_item)
-from backend.backend import get_html, get_info_item
-from models.model import UrlCheck, ProductId
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from database.FDataBase import (add_item_info, add_items_info, delete_item,
+                                set_poll_interval, add_subscription,
+                                delete_subscription,
+                                select_history_price, select_history_version,
+                                select_list_version, stream_history,
+                                get_session, get_read_session,
+                                select_all_item)
+from backend.backend import get_html, get_info_item, get_items_info
+from models.model import (UrlCheck, UrlCheckList, ProductId,
+                          SubscriptionCreate)
+from cache.cache import response_cache, product_scope
+from alerts.alerts import alert_pipeline
+from config import MONITORING_MIN_INTERVAL
+from metrics.metrics import render
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 app_parsing = APIRouter(prefix="/parsing")
+app_metrics = APIRouter()
+
+
+def _http_date(date: datetime | None) -> str | None:
+    """Форматирует время (UTC) для заголовка Last-Modified."""
+    if date is None:
+        return None
+    return format_datetime(date.replace(tzinfo=timezone.utc, microsecond=0),
+                           usegmt=True)
+
+
+def _not_modified(request: Request, validators: dict) -> bool:
+    """Проверяет, совпадают ли условия запроса с текущей версией данных."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/")
+                for tag in if_none_match.split(",")]
+        return "*" in tags or validators["etag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators["last_modified"]:
+        try:
+            return (parsedate_to_datetime(if_modified_since)
+                    >= parsedate_to_datetime(validators["last_modified"]))
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _validator_headers(validators: dict) -> dict:
+    """Собирает заголовки ETag/Last-Modified для ответа."""
+    headers = {"ETag": validators["etag"], "Cache-Control": "no-cache"}
+    if validators["last_modified"]:
+        headers["Last-Modified"] = validators["last_modified"]
+    return headers
 
 
 @app_parsing.post("/add_product")
@@ -65,12 +155,56 @@ async def add_product(url: UrlCheck,
                                           rating=data['rating'],
                                           url_info=str(url.url_info),
                                           url_price=str(url.url_price),
+                                          poll_interval=url.poll_interval,
                                           session=session)
             return {"message": resault['message'],
                     'status_code': resault['status_code']}
         else:
             return {"message": data["error"], "status_code": data["status_code"]}
-        
+
+
+@app_parsing.post("/add_products")
+async def add_products(urls: UrlCheckList,
+                       session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция пакетного добавления товаров на мониторинг.
+
+    Args:
+
+        items: Список пар URL от API МВИДЕО (url_info, url_price).
+
+    Returns:
+
+        Добавляет все корректные товары в базу данных одним запросом,
+        возвращает результат по каждому товару.
+    """
+    infos = await get_items_info([str(url.url_info) for url in urls.items])
+    results, rows = [], []
+    for url, data in zip(urls.items, infos):
+        item = {"url_info": str(url.url_info)}
+        if data["status_code"] == 200:
+            rows.append({"name": data["name"],
+                         "description": data["description"],
+                         "rating": data["rating"],
+                         "url_info": str(url.url_info),
+                         "url_price": str(url.url_price),
+                         "poll_interval": url.poll_interval})
+            item.update({"name": data["name"], "status_code": 200})
+        else:
+            item.update({"message": data["error"],
+                         "status_code": data["status_code"]})
+        results.append(item)
+
+    resault = await add_items_info(items=rows, session=session)
+    if resault["status_code"] != 200:
+        return {"message": resault["message"],
+                "status_code": resault["status_code"]}
+    ids = iter(resault["message"])
+    for item in results:
+        if item["status_code"] == 200:
+            item["id"] = next(ids)
+    return {"message": results, "status_code": 200}
+
 
 @app_parsing.delete("/delete_product/{item_id}")
 async def delete_product(item_id: int,
@@ -87,56 +221,319 @@ async def delete_product(item_id: int,
         Удаляет товар и его историю цен из базы данных.
     """
     product = ProductId(product_id=item_id)
-    if await select_item(product_id=product.product_id, session=session):
-        resault = await delete_item(product_id=product.product_id,
-                                    session=session)
-        return {"message": resault['message'],
-                'status_code': resault['status_code']}
-    else:
-        return {"message": "Товар не найден в базе данных."}
+    resault = await delete_item(product_id=product.product_id,
+                                session=session)
+    if resault['status_code'] == 404:
+        return {"message": resault['message']}
+    return {"message": resault['message'],
+            'status_code': resault['status_code']}
+
+
+@app_parsing.post("/set_poll_interval/{item_id}")
+async def set_product_poll_interval(
+    item_id: int,
+    interval: int | None = Query(None, ge=MONITORING_MIN_INTERVAL),
+    session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция изменения интервала мониторинга товара.
+
+    Args:
+
+        item_id: id товара в базе данных.
+        interval: Интервал проверки цены в секундах (чаще - для
+            волатильных и важных товаров, реже - для стабильных),
+            без значения - общий интервал MONITORING_INTERVAL.
+
+    Returns:
+
+        Задаёт товару интервал мониторинга.
+    """
+    product = ProductId(product_id=item_id)
+    resault = await set_poll_interval(product_id=product.product_id,
+                                      poll_interval=interval,
+                                      session=session)
+    return {"message": resault['message'],
+            'status_code': resault['status_code']}
+
+
+@app_parsing.post("/subscribe")
+async def subscribe(subscription: SubscriptionCreate,
+                    session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция подписки на снижение цены товара.
+
+    Args:
+
+        subscription: id товара, контакт, порог цены и/или процент
+            снижения (SubscriptionCreate).
+
+    Returns:
+
+        Добавляет подписку, возвращает её id. Оповещение отправляется,
+        когда при очередной проверке цена опускается до порога (переходит
+        его сверху вниз) или снижается не меньше чем на drop_percent.
+    """
+    resault = await add_subscription(
+        product_id=subscription.product_id,
+        contact=subscription.contact,
+        threshold=subscription.threshold,
+        drop_percent=subscription.drop_percent,
+        session=session)
+    if resault['status_code'] == 200:
+        alert_pipeline.invalidate()
+    return {"message": resault['message'],
+            'status_code': resault['status_code']}
+
+
+@app_parsing.delete("/unsubscribe/{subscription_id}")
+async def unsubscribe(subscription_id: int,
+                      session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Функция удаления подписки на снижение цены.
+
+    Args:
+
+        subscription_id: id подписки.
+
+    Returns:
+
+        Удаляет подписку.
+    """
+    resault = await delete_subscription(subscription_id=subscription_id,
+                                        session=session)
+    if resault['status_code'] == 200:
+        alert_pipeline.invalidate()
+    return {"message": resault['message'],
+            'status_code': resault['status_code']}
 
 
 @app_parsing.get("/get_list_monitoring")
 async def get_list_monitoring(
-    session: AsyncSession = Depends(get_session)) -> dict:
+    request: Request,
+    response: Response,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: list[Literal["id", "name", "description", "rating"]] | None = Query(None),
+    session: AsyncSession = Depends(get_read_session)) -> dict:
     """
     Функция получения товаров, находящихся на мониторинге.
 
+    Args:
+
+        after_id: Курсор - id последнего товара предыдущей страницы.
+        limit: Количество товаров на странице.
+        fields: Возвращаемые поля (?fields=name&fields=rating),
+            по умолчанию все.
+
     Returns:
 
-        Возвращает словарь со списком товаров,
-        находящихся в данный момент на мониторинге.
+        Возвращает словарь со страницей товаров,
+        находящихся в данный момент на мониторинге,
+        и курсором (next_cursor) для получения следующей страницы.
+        Если список не менялся с версии клиента - 304 Not Modified.
     """
-    resault = await select_all_item(session=session)
+    validators = await response_cache.get("list", "validators")
+    if validators is None:
+        version = await select_list_version(session=session)
+        validators = {"etag": f'"list-{version["version"]}"',
+                      "last_modified": _http_date(version["updated_at"])}
+        await response_cache.set("list", "validators", validators)
+    headers = _validator_headers(validators)
+    if _not_modified(request, validators):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    params = f"{after_id}:{limit}:{','.join(fields or [])}"
+    cached = await response_cache.get("list", params)
+    if cached is not None:
+        return cached
+    resault = await select_all_item(after_id=after_id, limit=limit,
+                                    fields=fields, session=session)
     if resault['message'] == []:
-        return {"message": "Нет товаров на мониторинге!",
-                    'status_code': resault['status_code']}
-    else:
+        body = {"message": "Нет товаров на мониторинге!",
+                'status_code': resault['status_code']}
+    elif resault['status_code'] != 200:
         return {"message": resault['message'],
                     'status_code': resault['status_code']}
+    else:
+        body = {"message": resault['message'],
+                'next_cursor': resault['next_cursor'],
+                'status_code': resault['status_code']}
+    body = jsonable_encoder(body)
+    await response_cache.set("list", params, body)
+    return body
 
 
 @app_parsing.get("/get_history_price_item/{item_id}")
 async def get_history_price_item(
     item_id: int,
-    session: AsyncSession = Depends(get_session)) -> dict:
+    request: Request,
+    response: Response,
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    limit: int = Query(1000, ge=1, le=10000),
+    bucket: Literal["hour", "day", "week", "month"] | None = None,
+    session: AsyncSession = Depends(get_read_session)) -> dict:
     """
     Функция получения истории цен заданного товара.
 
     Args:
 
         item_id: id товара в базе данных.
+        from: Начало периода (включительно), время с часовым поясом
+            приводится к UTC.
+        to: Конец периода (не включительно).
+        limit: Максимальное количество записей (или интервалов).
+        bucket: Интервал агрегации (hour, day, week, month),
+            при нём возвращаются min/max/avg/last за интервал.
 
     Returns:
 
-        Возвращает словарь со списком истории цен на заданный товар.
+        Возвращает словарь со списком истории цен на заданный товар
+        (последние limit записей периода, truncated - есть более ранние).
+        Если история не менялась с версии клиента - 304 Not Modified.
     """
     product = ProductId(product_id=item_id)
-    if await select_item(product_id=product.product_id, session=session):
-        resault = await select_history_price(product_id=product.product_id,
-                                             session=session)
+    scope = product_scope(product.product_id)
+    validators = await response_cache.get(scope, "validators")
+    if validators is None:
+        version = await select_history_version(
+            product_id=product.product_id, session=session)
+        if version is None:
+            return {"message": "Товар не найден в базе данных."}
+        updated_at = version["updated_at"]
+        stamp = int(updated_at.timestamp() * 1000000) if updated_at else 0
+        validators = {"etag": f'"history-{product.product_id}-{stamp}"',
+                      "last_modified": _http_date(updated_at)}
+        await response_cache.set(scope, "validators", validators)
+    headers = _validator_headers(validators)
+    if _not_modified(request, validators):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    params = f"{date_from}:{date_to}:{limit}:{bucket}"
+    cached = await response_cache.get(scope, params)
+    if cached is not None:
+        return cached
+    resault = await select_history_price(product_id=product.product_id,
+                                         date_from=date_from,
+                                         date_to=date_to,
+                                         limit=limit,
+                                         bucket=bucket,
+                                         session=session)
+    if resault['status_code'] == 404:
+        return {"message": resault['message']}
+    if resault['status_code'] != 200:
         return {"message": resault['message'],
                 'status_code': resault['status_code']}
-    else:
-        return {"message": "Товар не найден в базе данных."}
-   
\ No newline at end of file
+    body = jsonable_encoder({"message": resault['message'],
+                             'truncated': resault['truncated'],
+                             'status_code': resault['status_code']})
+    await response_cache.set(scope, params, body)
+    return body
+
+
+def _isoformat(date: datetime | None) -> str | None:
+    """Форматирует время записи истории для выгрузки."""
+    return date.isoformat() if date is not None else None
+
+
+async def _export_ndjson(product_ids: list | None):
+    """Отдаёт историю цен пакетами строк NDJSON."""
+    async for rows in stream_history(product_ids=product_ids):
+        yield "".join(
+            json.dumps({"product_id": row.product_id, "price": row.price,
+                        "date": _isoformat(row.timestamp),
+                        "aggregated": row.aggregated}) + "\n"
+            for row in rows)
+
+
+async def _export_csv(product_ids: list | None):
+    """Отдаёт историю цен пакетами строк CSV (с заголовком)."""
+    yield "product_id,price,date,aggregated\r\n"
+    async for rows in stream_history(product_ids=product_ids):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row.product_id, row.price, _isoformat(row.timestamp),
+             int(row.aggregated))
+            for row in rows)
+        yield buffer.getvalue()
+
+
+@app_parsing.get("/export_history")
+async def export_history(
+    product_id: list[int] | None = Query(None),
+    format: Literal["ndjson", "csv"] = "ndjson") -> StreamingResponse:
+    """
+    Функция выгрузки истории цен.
+
+    Args:
+
+        product_id: id товаров (?product_id=1&product_id=2),
+            по умолчанию все товары.
+        format: Формат выгрузки: ndjson или csv.
+
+    Returns:
+
+        Возвращает историю цен потоком, не собирая её в памяти целиком.
+        Дни, свёрнутые политикой хранения, выгружаются одной строкой
+        (последняя цена дня) с признаком aggregated.
+    """
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(product_id), media_type="text/csv",
+            headers={"Content-Disposition":
+                     "attachment; filename=price_history.csv"})
+    return StreamingResponse(_export_ndjson(product_id),
+                             media_type="application/x-ndjson")
+
+
+@app_parsing.get("/monitoring_stats")
+async def get_monitoring_stats() -> dict:
+    """
+    Функция получения статистики мониторинга цен.
+
+    Returns:
+
+        Возвращает статистику последнего прохода мониторинга.
+    """
+    # Модуль мониторинга (и обслуживания истории) загружается только
+    # при запросе статистики, а не при импорте приложения
+    from monitoring.monitoring import get_last_cycle
+
+    stats = get_last_cycle()
+    if not stats:
+        return {"message": "Мониторинг ещё не выполнялся.",
+                'status_code': 200}
+    return {"message": stats, 'status_code': 200}
+
+
+@app_parsing.get("/cache_stats")
+async def get_cache_stats() -> dict:
+    """
+    Функция получения статистики кэша ответов.
+
+    Returns:
+
+        Возвращает число попаданий (локальный и общий уровень),
+        промахов и долю попаданий.
+    """
+    return {"message": response_cache.stats(), 'status_code': 200}
+
+
+@app_metrics.get("/metrics")
+async def get_metrics():
+    """
+    Функция выгрузки метрик производительности.
+
+    Returns:
+
+        Возвращает метрики в текстовом формате Prometheus,
+        иначе сообщение о том, что метрики выключены, и статус код.
+    """
+    body, content_type = render()
+    if body is None:
+        return {"message": "Метрики выключены (METRICS_ENABLED=0 "
+                           "или не установлен prometheus_client).",
+                'status_code': 404}
+    return Response(content=body, media_type=content_type)
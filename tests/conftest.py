@@ -0,0 +1,57 @@
+"""
+Общие настройки тестов.
+
+Тесты запускаются из корня репозитория:
+
+    python -m pytest -q
+
+Тесты, которым нужна база данных PostgreSQL (настройки DB_* в config.py),
+выполняются только при TEST_DATABASE=1: они создают и удаляют таблицы,
+поэтому запускать их можно только на тестовой базе.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+
+requires_database = pytest.mark.skipif(
+    os.environ.get("TEST_DATABASE") != "1",
+    reason="нужна тестовая база PostgreSQL (TEST_DATABASE=1)")
+
+
+def run(coro):
+    """Выполняет корутину в новом цикле событий."""
+    return asyncio.run(coro)
+
+
+def run_database(coro):
+    """
+    Выполняет корутину, работающую с базой, и закрывает пулы движков
+    в том же цикле событий (соединения привязаны к циклу).
+    """
+    from database.FDataBase import engine, replica_engine
+
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            for target in {engine, replica_engine}:
+                await target.dispose()
+
+    return asyncio.run(wrapper())
+
+
+async def reset_schema() -> None:
+    """Удаляет все таблицы тестовой базы (схема public создаётся заново)."""
+    from sqlalchemy import text
+
+    from database.FDataBase import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
@@ -0,0 +1,158 @@
+"""Тесты индекса подписок и отправки оповещений (без базы данных)."""
+import asyncio
+import socket
+import time
+
+from aiohttp import web
+
+from alerts.alerts import AlertIndex, AlertPipeline, MemorySink, WebhookSink
+from backend.client import close_client
+from conftest import run
+
+
+def _index(*subscriptions) -> AlertIndex:
+    index = AlertIndex()
+    index.load(list(subscriptions))
+    return index
+
+
+def _fired(alerts: list) -> list:
+    return sorted((alert.subscription_id, alert.kind) for alert in alerts)
+
+
+def test_threshold_bounds():
+    # (id подписки, id товара, контакт, порог, процент снижения)
+    index = _index((1, 7, "a", 90, None), (2, 7, "b", 100, None),
+                   (3, 7, "c", 110, None), (4, 8, "d", 100, None))
+    # Порог, равный новой цене, сработал, равный старой - нет
+    assert _fired(index.evaluate(7, 110, 100)) == [(2, "threshold")]
+    assert _fired(index.evaluate(7, 120, 90)) == [
+        (1, "threshold"), (2, "threshold"), (3, "threshold")]
+    assert index.evaluate(7, 100, 100) == []
+    assert index.evaluate(7, 90, 110) == []
+    assert index.evaluate(7, None, 90) == []
+    assert index.evaluate(9, 110, 90) == []
+
+
+def test_drop_exactly_at_percent():
+    index = _index((1, 7, "a", None, 10), (2, 7, "b", None, 10.5),
+                   (3, 7, "c", None, 5))
+    assert _fired(index.evaluate(7, 100, 90)) == [(1, "drop"), (3, "drop")]
+    assert _fired(index.evaluate(7, 100, 95)) == [(3, "drop")]
+
+
+def test_threshold_and_drop_alert_once():
+    index = _index((1, 7, "a", 95, 5), (2, 7, "b", None, 5))
+    alerts = index.evaluate(7, 100, 90)
+    assert _fired(alerts) == [(1, "threshold"), (2, "drop")]
+    assert _fired(index.evaluate(7, 100, 96)) == []
+    # Порог не пересечён, сработал только процент снижения
+    assert _fired(index.evaluate(7, 200, 190)) == [(1, "drop"), (2, "drop")]
+
+
+class FlakySink(MemorySink):
+    """Получатель, который не принимает первые failures пакетов."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def send(self, alerts: list) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("получатель недоступен")
+        await super().send(alerts)
+
+
+def _pipeline(sink, max_pending: int = 100, *subscriptions):
+    pipeline = AlertPipeline(sink, refresh_interval=3600,
+                             max_pending=max_pending)
+    # Индекс задаётся напрямую, версия подписок не перечитывается
+    pipeline.index.load(list(subscriptions))
+    pipeline.checked_at = time.monotonic()
+    return pipeline
+
+
+def _price(product_id: int, last_price: float, price: float) -> dict:
+    return {"product_id": product_id, "price": price,
+            "last_price": last_price}
+
+
+def test_failed_alerts_are_retried():
+    sink = FlakySink(failures=1)
+    pipeline = _pipeline(sink, 100, (1, 7, "a", 95, None),
+                         (2, 8, "b", 95, None))
+
+    async def check():
+        first = await pipeline.process([_price(7, 100, 90)])
+        second = await pipeline.process([_price(8, 100, 90)])
+        return first, second
+
+    assert run(check()) == (0, 2)
+    assert [alert.product_id for alert in sink.sent] == [7, 8]
+    assert pipeline.stats() == {"evaluated": 2, "sent": 2, "failed": 1,
+                                "dropped": 0, "pending": 0,
+                                "subscriptions": 2}
+
+
+def test_pending_is_bounded():
+    sink = FlakySink(failures=2)
+    pipeline = _pipeline(sink, 2, (1, 7, "a", 95, None),
+                         (2, 8, "b", 95, None), (3, 9, "c", 95, None))
+
+    async def check():
+        await pipeline.process([_price(7, 100, 90), _price(8, 100, 90)])
+        await pipeline.process([_price(9, 100, 90)])
+        # Без новых цен отправляются только отложенные оповещения
+        return await pipeline.process([])
+
+    assert run(check()) == 2
+    # Отброшено самое старое оповещение
+    assert [alert.product_id for alert in sink.sent] == [8, 9]
+    stats = pipeline.stats()
+    assert (stats["failed"], stats["dropped"], stats["pending"]) == \
+        (5, 1, 0)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_webhook_sink_posts_with_timeout():
+    async def check():
+        received = []
+
+        async def hook(request: web.Request) -> web.Response:
+            received.append(await request.json())
+            return web.Response()
+
+        async def slow(request: web.Request) -> web.Response:
+            await asyncio.sleep(1)
+            return web.Response()
+
+        app = web.Application()
+        app.add_routes([web.post("/hook", hook), web.post("/slow", slow)])
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        port = _free_port()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        alerts = _index((1, 7, "a", 95, None)).evaluate(7, 100, 90)
+        try:
+            await WebhookSink(f"http://127.0.0.1:{port}/hook").send(alerts)
+            pipeline = _pipeline(
+                WebhookSink(f"http://127.0.0.1:{port}/slow", timeout=0.1),
+                100, (1, 7, "a", 95, None))
+            await pipeline.process([_price(7, 100, 90)])
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return received, pipeline.stats()
+
+    received, stats = run(check())
+    assert received == [[{"subscription_id": 1, "product_id": 7,
+                          "contact": "a", "kind": "threshold", "value": 95,
+                          "old_price": 100, "new_price": 90}]]
+    # Зависший получатель не блокирует конвейер дольше таймаута
+    assert (stats["failed"], stats["pending"]) == (1, 1)
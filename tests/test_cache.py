@@ -0,0 +1,121 @@
+"""Тесты двухуровневого кэша ответов (общий уровень - MemoryBackend)."""
+from types import SimpleNamespace
+
+import pytest
+
+import cache.cache as cache_module
+from cache.cache import (MemoryBackend, ResponseCache, TTLCache,
+                         product_scope)
+from conftest import run
+
+
+class Clock:
+    """Управляемые часы вместо time.monotonic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time",
+                        SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_ttl_cache_expires_and_evicts_oldest(clock):
+    local = TTLCache(max_items=2, ttl=10)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1
+    local.set("c", 3)
+    # "a" только что прочитан, поэтому вытесняется "b"
+    assert local.get("b") is None
+    assert local.get("a") == 1
+    clock.now += 11
+    assert local.get("a") is None
+    assert local.get("c") is None
+
+
+def test_memory_backend_ttl_and_incr(clock):
+    async def check():
+        backend = MemoryBackend()
+        await backend.set("key", "value", ex=5)
+        await backend.set("forever", "value")
+        assert await backend.get("key") == "value"
+        clock.now += 6
+        assert await backend.get("key") is None
+        assert await backend.get("forever") == "value"
+        assert await backend.incr("counter") == 1
+        assert await backend.incr("counter") == 2
+
+    run(check())
+
+
+def test_shared_tier_fills_local_after_local_expiry(clock):
+    async def check():
+        backend = MemoryBackend()
+        # Общий уровень живёт дольше локального
+        writer = ResponseCache(ttl=30, max_items=10, backend=backend,
+                               enabled=True)
+        reader = ResponseCache(ttl=30, max_items=10, backend=backend,
+                               enabled=True)
+        await writer.set("list", "page=1", {"message": [1]})
+        assert await reader.get("list", "page=1") == {"message": [1]}
+        assert await reader.get("list", "page=1") == {"message": [1]}
+        assert reader.counters == {"hits_local": 1, "hits_shared": 1,
+                                   "misses": 0}
+        clock.now += 31
+        assert await reader.get("list", "page=1") is None
+        assert reader.stats()["misses"] == 1
+
+    run(check())
+
+
+def test_invalidate_reaches_other_processes(clock):
+    async def check():
+        backend = MemoryBackend()
+        first = ResponseCache(ttl=60, max_items=10, backend=backend,
+                              enabled=True)
+        second = ResponseCache(ttl=60, max_items=10, backend=backend,
+                               enabled=True)
+        scope = product_scope(7)
+        await first.set(scope, "raw", {"message": "old"})
+        await first.set("list", "page=1", {"message": "list"})
+
+        await second.invalidate(scope)
+        # В процессе инвалидации запись недостижима сразу
+        assert await second.get(scope, "raw") is None
+        # Другой процесс читает старую локальную запись не дольше ttl,
+        # а общий уровень уже отдаёт промах
+        assert await first.get(scope, "raw") == {"message": "old"}
+        first.local.clear()
+        assert await first.get(scope, "raw") is None
+        # Другие области не затронуты
+        assert await second.get("list", "page=1") == {"message": "list"}
+
+        await second.set(scope, "raw", {"message": "new"})
+        assert await first.get(scope, "raw") == {"message": "new"}
+
+    run(check())
+
+
+def test_local_only_invalidation_and_disabled_cache():
+    async def check():
+        local_only = ResponseCache(ttl=60, max_items=10, enabled=True)
+        await local_only.set("list", "page=1", {"message": [1]})
+        await local_only.invalidate("list")
+        assert await local_only.get("list", "page=1") is None
+
+        disabled = ResponseCache(ttl=60, max_items=10,
+                                 backend=MemoryBackend(), enabled=False)
+        await disabled.set("list", "page=1", {"message": [1]})
+        assert await disabled.get("list", "page=1") is None
+        assert disabled.stats() == {"hits_local": 0, "hits_shared": 0,
+                                    "misses": 0, "hit_ratio": 0.0}
+
+    run(check())
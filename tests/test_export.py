@@ -0,0 +1,36 @@
+"""Тесты потоковой выгрузки истории цен (нужна тестовая база)."""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from conftest import requires_database, reset_schema, run_database
+from database.FDataBase import create_tables, engine, stream_history
+
+
+pytestmark = requires_database
+
+
+async def _export_with_rollups() -> list:
+    await reset_schema()
+    await create_tables()
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO products (name, url_info, url_price) "
+            "VALUES ('test', 'http://stub/info/1', 'http://stub/price/1')"))
+        await conn.execute(text(
+            "INSERT INTO price_history_daily "
+            "(product_id, day, min, max, avg, last, samples) "
+            "VALUES (1, '2024-01-01', 90, 110, 100, 95, 24)"))
+        await conn.execute(text(
+            "INSERT INTO price_history (product_id, price, timestamp) "
+            "VALUES (1, 80, '2024-02-01 12:00')"))
+    rows = []
+    async for chunk in stream_history(product_ids=[1], chunk_size=1):
+        rows.extend(tuple(row) for row in chunk)
+    return rows
+
+
+def test_export_includes_daily_rollups():
+    assert run_database(_export_with_rollups()) == [
+        (1, 95, datetime(2024, 1, 1), True),
+        (1, 80, datetime(2024, 2, 1, 12), False)]
@@ -0,0 +1,165 @@
+"""Тесты планировщика запросов против локальной заглушки МВИДЕО."""
+import asyncio
+import random
+import socket
+from types import SimpleNamespace
+
+from aiohttp import web
+
+import benchmarks.stub_mvideo as stub_mvideo
+from backend.backend import FetchScheduler
+from backend.client import close_client
+from benchmarks.stub_mvideo import start_stub
+from conftest import run
+
+
+def _free_port() -> int:
+    """Возвращает свободный локальный порт для заглушки."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _stub_answers(monkeypatch, *values: float) -> None:
+    """
+    Подменяет случайные числа заглушки: первое число каждого запроса
+    решает, ответить ли ошибкой, второе - 429 (< 0.5) или 503.
+    """
+    answers = iter(values)
+    monkeypatch.setattr(stub_mvideo, "random", SimpleNamespace(
+        random=lambda: next(answers, 0.9), uniform=random.uniform))
+
+
+def _scheduler(**kwargs) -> FetchScheduler:
+    options = {"rate": 100, "burst": 100, "min_rate": 1, "max_retries": 3,
+               "backoff_base": 0.01, "backoff_max": 0.01,
+               "breaker_failures": 10, "breaker_reset": 0.2}
+    return FetchScheduler(**{**options, **kwargs})
+
+
+def test_retries_429_and_503(monkeypatch):
+    # 429 (с Retry-After: 1), затем 503, затем успешный ответ
+    _stub_answers(monkeypatch, 0.1, 0.1, 0.1, 0.9, 0.9)
+
+    async def check():
+        runner, base_url = await start_stub(port=_free_port(),
+                                            fail_rate=0.5)
+        scheduler = _scheduler()
+        try:
+            resault = await scheduler.fetch(f"{base_url}/price/1")
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return resault, scheduler.stats()
+
+    resault, stats = run(check())
+    assert resault["status_code"] == 200
+    assert stats["requests"] == 3
+    host = next(iter(stats["hosts"].values()))
+    # Скорость снижена на 429 и лишь слегка восстановлена успехом
+    assert host["rate"] < 100
+    assert not host["circuit_open"]
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    # Заглушка с fail_rate=1 всегда отвечает 503
+    monkeypatch.setattr(stub_mvideo, "random", SimpleNamespace(
+        random=lambda: 0.9, uniform=random.uniform))
+
+    async def check():
+        port = _free_port()
+        runner, base_url = await start_stub(port=port, fail_rate=1.0)
+        scheduler = _scheduler(max_retries=1, breaker_failures=2)
+        url = f"{base_url}/price/1"
+        try:
+            failed = await scheduler.fetch(url)
+            opened = scheduler.stats()
+            rejected = await scheduler.fetch(url)
+            requests = scheduler.stats()["requests"]
+            # Хост восстановился, пробный запрос после breaker_reset
+            await runner.cleanup()
+            runner, _ = await start_stub(port=port)
+            await asyncio.sleep(0.25)
+            recovered = await scheduler.fetch(url)
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return failed, opened, rejected, requests, recovered, \
+            scheduler.stats()
+
+    failed, opened, rejected, requests, recovered, stats = run(check())
+    assert "error" in failed
+    host = next(iter(opened["hosts"].values()))
+    assert host["circuit_open"] and host["failures"] == 2
+    assert "приостановлены" in rejected["error"]
+    # Пока цепь разомкнута, запросы к хосту не отправляются
+    assert requests == opened["requests"] == 2
+    assert recovered["status_code"] == 200
+    host = next(iter(stats["hosts"].values()))
+    assert not host["circuit_open"] and host["failures"] == 0
+
+
+def test_not_modified_reuses_cached_body():
+    async def check():
+        runner, base_url = await start_stub(port=_free_port())
+        scheduler = _scheduler()
+        try:
+            first = await scheduler.fetch(f"{base_url}/price/7")
+            second = await scheduler.fetch(f"{base_url}/price/7")
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return first, second, scheduler.stats()
+
+    first, second, stats = run(check())
+    assert first == second
+    assert first["message"]["body"]["materialPrices"][0]["productId"] == "7"
+    assert stats["requests"] == 2
+    assert stats["not_modified"] == 1
+    assert stats["cached_urls"] == 1
+
+
+def test_concurrent_identical_urls_are_coalesced():
+    async def check():
+        runner, base_url = await start_stub(port=_free_port())
+        scheduler = _scheduler()
+        urls = [f"{base_url}/price/3?a=1&b=2"] * 3 + \
+            [f"{base_url}/price/3?b=2&a=1#fragment"] * 2
+        try:
+            resaults = await asyncio.gather(
+                *(scheduler.fetch(url) for url in urls))
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return resaults, scheduler.stats()
+
+    resaults, stats = run(check())
+    assert all(resault["status_code"] == 200 for resault in resaults)
+    assert stats["requests"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_original_url_is_requested():
+    async def check():
+        requested = []
+
+        async def echo(request: web.Request) -> web.Response:
+            requested.append(request.path_qs)
+            return web.json_response({"body": {}})
+
+        app = web.Application()
+        app.add_routes([web.get("/{path:.*}", echo)])
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        port = _free_port()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        scheduler = _scheduler()
+        try:
+            await scheduler.fetch(f"http://127.0.0.1:{port}/Item?b=2&a=1")
+        finally:
+            await close_client()
+            await runner.cleanup()
+        return requested
+
+    # Нормализованный URL (?a=1&b=2) - только ключ кэша
+    assert run(check()) == ["/Item?b=2&a=1"]
@@ -0,0 +1,65 @@
+"""Тесты выборки истории цен (без базы данных)."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from database.FDataBase import _aggregate_changes, _naive_utc
+
+
+def test_naive_utc_converts_aware_time():
+    moscow = timezone(timedelta(hours=3))
+    assert _naive_utc(datetime(2024, 1, 1, 3, tzinfo=moscow)) == \
+        datetime(2024, 1, 1, 0)
+    assert _naive_utc(datetime(2024, 1, 1, tzinfo=timezone.utc)) == \
+        datetime(2024, 1, 1)
+
+
+def test_naive_utc_keeps_naive_time():
+    assert _naive_utc(datetime(2024, 1, 1, 12)) == datetime(2024, 1, 1, 12)
+    assert _naive_utc(None) is None
+
+
+def _point(timestamp, price, low=None, high=None, avg=None, samples=1):
+    """Точка ряда цен, как её возвращает _price_series."""
+    return SimpleNamespace(
+        timestamp=timestamp, price=price,
+        min_price=price if low is None else low,
+        max_price=price if high is None else high,
+        sum_price=(price if avg is None else avg) * samples, samples=samples)
+
+
+def test_buckets_carry_price_into_bucket():
+    points = [_point(datetime(2024, 1, 1, 12), 100),
+              _point(datetime(2024, 1, 1, 13, 20), 90)]
+    history = _aggregate_changes(1, points, "hour",
+                                 datetime(2024, 1, 1, 15, 30), 100)
+    assert [row["date"].hour for row in history] == [12, 13, 14, 15]
+    hour_13 = history[1]
+    assert (hour_13["min"], hour_13["max"], hour_13["last"]) == (90, 100, 90)
+    # 20 минут по 100 и 40 минут по 90
+    assert hour_13["avg"] == round((100 * 20 + 90 * 40) / 60, 2)
+    assert history[2] == {"product_id": 1, "date": datetime(2024, 1, 1, 14),
+                          "min": 90, "max": 90, "avg": 90, "last": 90}
+
+
+def test_buckets_end_is_exclusive():
+    points = [_point(datetime(2024, 1, 1, 10, 30), 100)]
+    history = _aggregate_changes(1, points, "hour",
+                                 datetime(2024, 1, 1, 12), 100)
+    assert [row["date"].hour for row in history] == [10, 11]
+
+
+def test_buckets_respect_limit():
+    points = [_point(datetime(2024, 1, 1), 100)]
+    history = _aggregate_changes(1, points, "day", datetime(2024, 2, 1), 5)
+    assert len(history) == 5
+    assert history[-1]["date"] == datetime(2024, 1, 5)
+
+
+def test_buckets_use_daily_rollups():
+    points = [_point(datetime(2024, 1, 1), 95, low=90, high=110, avg=100,
+                     samples=4),
+              _point(datetime(2024, 1, 3), 80)]
+    history = _aggregate_changes(1, points, "day", datetime(2024, 1, 4), 10)
+    assert [(row["min"], row["max"], row["avg"], row["last"])
+            for row in history] == [(90, 110, 100, 95), (95, 95, 95, 95),
+                                    (80, 80, 80, 80)]
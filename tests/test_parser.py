@@ -0,0 +1,42 @@
+"""Тесты разбора ответов API магазина."""
+import pytest
+
+from backend.parser import (_select_backend, extract_info, extract_price,
+                            loads)
+
+
+def _price(**fields) -> dict:
+    return {"body": {"materialPrices": [{"price": fields}]}}
+
+
+def test_price_prefers_sale_price():
+    item = extract_price(_price(basePrice=1000, salePrice=900))
+    assert (item.base_price, item.sale_price, item.price) == (1000, 900, 900)
+
+
+def test_price_with_null_fields():
+    item = extract_price(_price(basePrice=None, salePrice=900))
+    assert (item.base_price, item.sale_price, item.price) == (900, 900, 900)
+    item = extract_price(_price(basePrice=1000, salePrice=None))
+    assert (item.base_price, item.sale_price, item.price) == \
+        (1000, None, 1000)
+    with pytest.raises(TypeError):
+        extract_price(_price(basePrice=None, salePrice=None))
+
+
+def test_info_with_null_fields():
+    info = extract_info(loads(
+        b'{"body": {"name": "\xd0\xa2\xd0\xbe\xd0\xb2\xd0\xb0\xd1\x80",'
+        b' "description": null, "rating": null}}'))
+    assert (info.name, info.description, info.rating) == \
+        ("Товар", None, None)
+    info = extract_info({"body": {"name": "Товар", "description": "...",
+                                  "rating": {"star": None}}})
+    assert info.rating is None
+
+
+def test_missing_json_backend_fails_loudly():
+    assert _select_backend("json")[0] == "json"
+    assert _select_backend("auto")[0] in ("orjson", "ujson", "json")
+    with pytest.raises(RuntimeError):
+        _select_backend("no_such_json_backend")
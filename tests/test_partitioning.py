@@ -0,0 +1,63 @@
+"""Тесты секционирования истории цен (нужна тестовая база)."""
+from sqlalchemy import text
+
+from conftest import requires_database, reset_schema, run_database
+from database.FDataBase import create_tables, engine, migrate_tables
+from database.partitioning import (_is_partitioned, _partitions,
+                                   ensure_partitions, partition_tables)
+
+
+pytestmark = requires_database
+
+
+async def _partition_twice() -> tuple:
+    await reset_schema()
+    await create_tables()
+    await migrate_tables()
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO products (name, url_info, url_price) "
+            "VALUES ('test', 'http://stub/info/1', 'http://stub/price/1')"))
+        await conn.execute(text(
+            "INSERT INTO price_history (product_id, price, timestamp) "
+            "VALUES (1, 100, now() - interval '40 days')"))
+    for _ in range(2):
+        await partition_tables()
+        await ensure_partitions(ahead=2)
+    async with engine.begin() as conn:
+        partitioned = await _is_partitioned(conn)
+        partitions = await _partitions(conn)
+        rows = (await conn.execute(text(
+            "SELECT count(*) FROM price_history"))).scalar()
+        # Вставка после границы бывшей таблицы попадает в новую секцию
+        await conn.execute(text(
+            "INSERT INTO price_history (product_id, price, timestamp) "
+            "VALUES (1, 90, now() + interval '40 days')"))
+    return partitioned, partitions, rows
+
+
+def test_partition_tables_is_idempotent():
+    partitioned, partitions, rows = run_database(_partition_twice())
+    assert partitioned
+    names = [name for name, _ in partitions]
+    assert names[0] == "price_history_legacy"
+    assert len(names) == len(set(names)) >= 3
+    assert rows == 1
+
+
+async def _migrate_partitioned() -> int:
+    await reset_schema()
+    await create_tables()
+    await partition_tables()
+    # Миграции, применённые после секционирования
+    await migrate_tables()
+    async with engine.begin() as conn:
+        return (await conn.execute(text(
+            "SELECT count(*) FROM pg_constraint "
+            "WHERE conrelid = 'price_history'::regclass "
+            "AND conname = 'price_history_product_id_fkey' "
+            "AND confdeltype = 'c' AND convalidated"))).scalar()
+
+
+def test_migrations_run_on_partitioned_history():
+    assert run_database(_migrate_partitioned()) == 1
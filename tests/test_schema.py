@@ -0,0 +1,57 @@
+"""Тесты изменения схемы при старте (нужна тестовая база)."""
+import asyncio
+
+from sqlalchemy import text
+
+from conftest import requires_database, reset_schema, run_database
+from database.FDataBase import MIGRATIONS, engine, schema_is_current
+
+
+pytestmark = requires_database
+
+# Схема базы до миграций (исходные таблицы products и price_history)
+PRE_SERIES_SCHEMA = [
+    "CREATE TABLE products (id serial PRIMARY KEY, name varchar NOT NULL,"
+    " description varchar, rating double precision,"
+    " url_info varchar NOT NULL, url_price varchar NOT NULL)",
+    "CREATE TABLE price_history (id serial PRIMARY KEY,"
+    " product_id integer NOT NULL REFERENCES products (id),"
+    " price double precision NOT NULL, timestamp timestamp)",
+    "INSERT INTO products (name, url_info, url_price) "
+    "VALUES ('test', 'http://stub/info/1', 'http://stub/price/1')",
+    "INSERT INTO price_history (product_id, price, timestamp) "
+    "VALUES (1, 100, now())",
+]
+
+
+async def _migrate_pre_series_schema() -> tuple:
+    from main import main
+
+    await reset_schema()
+    async with engine.begin() as conn:
+        for statement in PRE_SERIES_SCHEMA:
+            await conn.execute(text(statement))
+    # Два воркера стартуют одновременно: второй ждёт блокировку, пока
+    # первый строит индексы CONCURRENTLY
+    await asyncio.wait_for(asyncio.gather(main(), main()), timeout=60)
+    async with engine.connect() as conn:
+        applied = (await conn.execute(text(
+            "SELECT count(*) FROM schema_migrations"))).scalar()
+        indexes = (await conn.execute(text(
+            "SELECT count(*) FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname IN ('ix_price_history_product_id_timestamp', "
+            "'ix_products_next_poll_at') AND i.indisvalid"))).scalar()
+        polled = (await conn.execute(text(
+            "SELECT count(*) FROM products "
+            "WHERE next_poll_at IS NOT NULL"))).scalar()
+    return applied, indexes, polled, await schema_is_current()
+
+
+def test_pre_series_schema_migrates_under_lock():
+    applied, indexes, polled, current = run_database(
+        _migrate_pre_series_schema())
+    assert applied == len(MIGRATIONS)
+    assert indexes == 2
+    assert polled == 1
+    assert current